@@ -0,0 +1,85 @@
+"""Compare latency and peak memory per report for the python-docx and OOXML backends.
+
+Each backend runs in its own child process so RSS figures are not shared:
+
+    python benchmarks/bench_backends.py --runs 200
+
+Peak memory is reported two ways: the tracemalloc peak of Python allocations
+during one report (lxml's C allocations are not traced), and the growth of the
+process high-water RSS over the timed runs.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_report import TYPICAL_SPEC  # noqa: E402
+
+
+def _max_rss_kib():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def measure(backend, runs):
+    from kyp_report import build_kyp_report
+
+    build_kyp_report(TYPICAL_SPEC, backend=backend)  # warm up imports and caches
+    rss_before = _max_rss_kib()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        build_kyp_report(TYPICAL_SPEC, backend=backend)
+        samples.append((time.perf_counter() - start) * 1000)
+    rss_after = _max_rss_kib()
+
+    tracemalloc.start()
+    size = len(build_kyp_report(TYPICAL_SPEC, backend=backend))
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "backend": backend,
+        "runs": runs,
+        "median_ms": statistics.median(samples),
+        "p95_ms": sorted(samples)[int(0.95 * (len(samples) - 1))],
+        "traced_peak_kib": traced_peak / 1024,
+        "max_rss_kib": rss_after,
+        "rss_growth_kib": rss_after - rss_before,
+        "report_kib": size / 1024,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--child", choices=("docx", "ooxml"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.runs)))
+        return 0
+
+    results = []
+    for backend in ("docx", "ooxml"):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--runs", str(args.runs), "--child", backend],
+                             check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(out))
+    for r in results:
+        print(f"{r['backend']:6s} median {r['median_ms']:7.2f} ms   p95 {r['p95_ms']:7.2f} ms   "
+              f"traced peak {r['traced_peak_kib']:8.1f} KiB   max RSS {r['max_rss_kib'] / 1024:6.1f} MiB "
+              f"(+{r['rss_growth_kib'] / 1024:.1f})   report {r['report_kib']:.1f} KiB")
+    print(f"speedup (median): {results[0]['median_ms'] / results[1]['median_ms']:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
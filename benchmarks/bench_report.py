@@ -0,0 +1,53 @@
+"""Compare report generation on a fresh Document against the cached template path.
+
+    python benchmarks/bench_report.py --runs 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kyp_funds import equities_texts, fixed_income_texts  # noqa: E402
+from kyp_report import build_kyp_report  # noqa: E402
+
+TYPICAL_SPEC = {
+    "selected_equities": list(equities_texts)[:2],
+    "selected_fixed_income": list(fixed_income_texts)[:1],
+    "compare_equities": list(equities_texts)[2:4],
+    "compare_fixed_income": list(fixed_income_texts)[1:3],
+    "risk_need_notes": "Needs growth to fund retirement in 20 years.",
+    "risk_ability_notes": "Stable employment income, no near-term withdrawals.",
+    "risk_willingness_notes": "Held through 2020 and 2022 drawdowns.",
+    "report_date": "2026-01-01",
+}
+
+
+def time_path(cached, runs):
+    build_kyp_report(TYPICAL_SPEC, cached=cached)  # warm up imports and caches
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        build_kyp_report(TYPICAL_SPEC, cached=cached)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    fresh = time_path(False, args.runs)
+    cached = time_path(True, args.runs)
+    for name, samples in (("fresh document", fresh), ("cached template", cached)):
+        print(f"{name:16s} median {statistics.median(samples):7.2f} ms   "
+              f"min {min(samples):7.2f} ms   mean {statistics.mean(samples):7.2f} ms")
+    print(f"speedup (median): {statistics.median(fresh) / statistics.median(cached):.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
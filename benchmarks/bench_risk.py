@@ -0,0 +1,46 @@
+"""Throughput of kyp_risk.score_book on a synthetic client book.
+
+    python benchmarks/bench_risk.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kyp_risk import LEVELS, PROFILES, score_book  # noqa: E402
+
+
+def synthetic_book(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    book = {column: np.array(LEVELS, dtype=object)[rng.integers(0, 3, rows)]
+            for column in ("risk_need", "risk_ability", "risk_willingness")}
+    book["final_risk_profile"] = np.array(PROFILES, dtype=object)[rng.integers(0, 4, rows)]
+    book["client_name"] = np.char.add("client-", np.arange(rows).astype(str)).astype(object)
+    return pd.DataFrame(book)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    book = synthetic_book(args.rows)
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        scored = score_book(book)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{args.rows:,} rows: best {best * 1000:.0f} ms ({args.rows / best:,.0f} rows/sec), "
+          f"{int(scored['profile_mismatch'].sum()):,} mismatches")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Micro-benchmark for the fund search index on synthetic catalogs.
+
+    python benchmarks/bench_search.py --sizes 10000 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kyp_funds import Fund  # noqa: E402
+from kyp_search import FundSearchIndex  # noqa: E402
+
+PROVIDERS = ["DFA", "iShares", "Mackenzie", "RBC", "Fidelity", "Lysander-Canso", "Vanguard", "BMO",
+             "TD", "CI", "Dynamic", "Franklin", "Manulife", "Invesco", "Beutel Goodman", "NEI"]
+REGIONS = ["Global", "Canadian", "US", "International", "Emerging Markets", "North American", "Core"]
+STRATEGIES = ["Equity", "Fixed Income", "Bond Index", "Dividend", "Small Cap", "Value", "Growth",
+              "Balanced", "Corporate Value Bond", "Unconstrained", "All-in-One Equity", "Universe Bond Index"]
+VEHICLES = ["Portfolio", "Fund", "ETF", "Index ETF Fund", "Class", "Pool"]
+SERIES = ["F", "A", "D", "I", "O", "T5"]
+QUERIES = ["x", "fi", "dfa", "xeqt", "DFA607", "global equity", "fid 75", "bond index", "mack unc",
+           "607", "nadian", "vanguard small cap value", "zzzz"]
+
+
+def synthetic_funds(n, seed=0):
+    rng = random.Random(seed)
+    funds = []
+    for i in range(n):
+        provider = rng.choice(PROVIDERS)
+        ticker = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(3, 4))) + (
+            str(rng.randint(100, 9999)) if rng.random() < 0.6 else "")
+        name = f"{provider} {rng.choice(REGIONS)} {rng.choice(STRATEGIES)} {rng.choice(VEHICLES)} " \
+               f"{rng.choice(SERIES)} ({ticker})"
+        funds.append(Fund(code=f"F{i:06d}", name=name, asset_class="equities", provider=provider, ticker=ticker))
+    funds.append(Fund(code="DFA607", name="DFA Global Equity Portfolio F (DFA607)", asset_class="equities",
+                      provider="Dimensional", ticker="DFA607", mer=0.32, holdings=13000))
+    return funds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    for size in args.sizes:
+        funds = synthetic_funds(size)
+        start = time.perf_counter()
+        index = FundSearchIndex(funds)
+        build = time.perf_counter() - start
+        print(f"{size:,} funds: index built in {build:.2f}s")
+        worst = 0.0
+        for query in QUERIES:
+            samples = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                hits = index.search(query, limit=args.limit)
+                samples.append((time.perf_counter() - start) * 1e6)
+            samples.sort()
+            p99 = samples[int(0.99 * (len(samples) - 1))]
+            worst = max(worst, p99)
+            print(f"  {query!r:28s} {len(hits):3d} hits   median {statistics.median(samples):8.1f} us   "
+                  f"p99 {p99:8.1f} us")
+        print(f"  worst p99: {worst / 1000:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Startup benchmark: import-time profile and cold start of the page against a budget.
+
+Every measurement runs in a fresh interpreter:
+
+- an -X importtime profile of the modules kyp_app.py imports, listing the
+  slowest top-level imports and the app's own modules (cumulative time);
+- the cold start, from interpreter launch to the end of the first AppTest run
+  of kyp_app.py, repeated --runs times. The median has to fit the budget.
+
+It also reports which of DEFERRED_MODULES are loaded once the first render has
+settled, checked after the pre-render debounce has passed so a pre-render the
+first run scheduled would have started. They are meant to load with the first
+report (or the first pre-render, after the user changes an input), not with
+the page.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "kyp_app.py")
+
+# Median cold start (interpreter launch to first page render) must fit this
+COLD_START_BUDGET_MS = 1200
+
+DEFERRED_MODULES = ("docx", "lxml", "pandas", "kyp_ooxml")
+
+# Seconds past the pre-render debounce to wait before checking DEFERRED_MODULES
+SETTLE_SECONDS = 0.75
+
+COLD_START = """
+import time
+start = time.perf_counter()
+import json, sys
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60).run()
+ms = (time.perf_counter() - start) * 1000
+from kyp_prerender import DEBOUNCE_SECONDS
+slept = DEBOUNCE_SECONDS + {settle!r}
+time.sleep(slept)
+print(json.dumps({{
+    "ms": ms,
+    "slept_ms": slept * 1000,
+    "loaded": [name for name in {deferred!r} if name in sys.modules],
+    "exception": [str(e.value) for e in at.exception],
+}}))
+"""
+
+
+def app_imports(path=APP_PATH):
+    """Top-level module names kyp_app.py imports, in order."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def import_profile(modules):
+    """Run -X importtime over modules; return [(name, depth, self_us, cumulative_us)]."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def cold_start():
+    code = COLD_START.format(app=APP_PATH, deferred=DEFERRED_MODULES, settle=SETTLE_SECONDS)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    wall = (time.perf_counter() - start) * 1000
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if result["exception"]:
+        raise RuntimeError(f"kyp_app.py raised during cold start: {result['exception'][0]}")
+    result["wall_ms"] = wall - result["slept_ms"]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=COLD_START_BUDGET_MS)
+    parser.add_argument("--output", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    modules = app_imports()
+    profile = import_profile(modules)
+    print(f"Import profile of kyp_app.py imports ({', '.join(modules)}):")
+    # Only the app's own imports: interpreter startup (site, encodings, ...) also
+    # shows up at depth 0 but is not part of what kyp_app.py costs
+    top_level = sorted((e for e in profile if e[1] == 0 and e[0] in modules), key=lambda e: -e[3])
+    for name, _, self_us, cumulative_us in top_level[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    own = [e for e in profile if e[0].startswith("kyp_")]
+    print("App modules (cumulative, including their own imports):")
+    for name, _, self_us, cumulative_us in own:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    total_us = sum(e[3] for e in top_level)
+
+    runs = [cold_start() for _ in range(args.runs)]
+    wall = statistics.median(run["wall_ms"] for run in runs)
+    first_render = statistics.median(run["ms"] for run in runs)
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+    print(f"Imports total:        {total_us / 1000:8.1f} ms")
+    print(f"Cold start (median):  {wall:8.1f} ms wall, {first_render:.1f} ms in-process to first render")
+    print(f"Deferred modules loaded after the first render: {', '.join(loaded) or 'none'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "imports_ms": total_us / 1000,
+                "modules_ms": {name: cumulative_us / 1000 for name, _, _, cumulative_us in top_level + own},
+                "cold_start_wall_ms": wall,
+                "first_render_ms": first_render,
+                "deferred_loaded": loaded,
+                "budget_ms": args.budget_ms,
+            }, f, indent=2)
+
+    if wall > args.budget_ms:
+        print(f"Cold start over budget: {wall:.0f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    print(f"Cold start within budget ({args.budget_ms:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Load test for the report worker service: latency and backpressure by concurrency.
+
+Starts a kyp_worker service in its own process, so its request threads do not
+compete with the client threads for the GIL, and for each concurrency level
+runs that many client threads each rendering --requests reports end to end (submit,
+wait on status, fetch the .docx). A refused submission (503) is counted and
+the client waits the Retry-After the service sent before its next request, as
+the page asks users to. A failed request (a refused or reset connection, a
+timeout or a failed job) is counted too, after a short backoff, and fails the
+run.
+
+Once concurrency exceeds the service's capacity (workers + queue size), extra
+load should turn into refusals rather than longer waits, so the p95 latency of
+accepted jobs holds. The run fails when a saturated level's p95 exceeds the
+first saturated level's by more than --p95-factor.
+"""
+import argparse
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_report import TYPICAL_SPEC
+from kyp_report import BACKENDS, DEFAULT_BACKEND
+from kyp_worker import WorkerBusy, WorkerClient
+
+BACKOFF_SECONDS = 0.05
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def start_service(workers, queue_size, backend):
+    """Start kyp_worker.py on a free port; return the process and its URL."""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "kyp_worker.py"), "--port", "0", "--workers", str(workers),
+         "--queue-size", str(queue_size), "--backend", backend],
+        stderr=subprocess.PIPE, text=True,
+    )
+    line = proc.stderr.readline()
+    match = re.search(r"http://\S+", line)
+    if not match:
+        proc.kill()
+        raise RuntimeError(f"kyp_worker.py did not start: {line.strip() or proc.stderr.read()}")
+    return proc, match.group(0)
+
+
+def run_level(url, concurrency, requests, spec):
+    latencies, refused, failed = [], [], []
+    lock = threading.Lock()
+
+    def client():
+        worker = WorkerClient(url)
+        for _ in range(requests):
+            start = time.perf_counter()
+            try:
+                worker.render(spec, poll=1.0)
+            except WorkerBusy as busy:
+                with lock:
+                    refused.append(1)
+                time.sleep(busy.retry_after)
+                continue
+            except (OSError, RuntimeError) as exc:
+                with lock:
+                    failed.append(f"{type(exc).__name__}: {exc}")
+                time.sleep(BACKOFF_SECONDS)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "accepted": len(latencies),
+        "refused": len(refused),
+        "failed": failed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+        "max_ms": max(latencies) * 1000 if latencies else None,
+        "throughput": len(latencies) / elapsed,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=10, help="reports per client at each level")
+    parser.add_argument("--p95-factor", type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    service, url = start_service(args.workers, args.queue_size, args.backend)
+    capacity = args.workers + args.queue_size
+    spec = dict(TYPICAL_SPEC, fee_amounts=[100_000])
+
+    try:
+        WorkerClient(url).render(spec)  # start the worker processes and warm their caches
+        print(f"{args.workers} workers, queue of {args.queue_size} (capacity {capacity}), backend {args.backend}")
+        print(f"{'clients':>7} {'accepted':>8} {'refused':>7} {'failed':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'reports/s':>9}")
+        results = []
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            result = run_level(url, concurrency, args.requests, spec)
+            results.append(result)
+            print(f"{result['concurrency']:>7} {result['accepted']:>8} {result['refused']:>7} {len(result['failed']):>6} "
+                  f"{result['p50_ms'] or 0:>8.1f} {result['p95_ms'] or 0:>8.1f} {result['max_ms'] or 0:>8.1f} "
+                  f"{result['throughput']:>9.1f}")
+    finally:
+        # Interrupt rather than terminate, so kyp_worker.py shuts its process pool down
+        service.send_signal(signal.SIGINT)
+        service.wait()
+
+    failures = [error for r in results for error in r["failed"]]
+    if failures:
+        print(f"{len(failures)} request(s) failed, first: {failures[0]}")
+        return 1
+    saturated = [r for r in results if r["concurrency"] >= capacity and r["p95_ms"] is not None]
+    if not saturated:
+        print("No level reached the service capacity; raise --concurrency to check p95 under saturation")
+        return 0
+    reference = saturated[0]["p95_ms"]
+    worst = max(saturated, key=lambda r: r["p95_ms"])
+    if worst["p95_ms"] > reference * args.p95_factor:
+        print(f"p95 grew under saturation: {worst['p95_ms']:.1f} ms at {worst['concurrency']} clients vs "
+              f"{reference:.1f} ms at {saturated[0]['concurrency']}")
+        return 1
+    print(f"p95 held under saturation: at most {worst['p95_ms']:.1f} ms vs {reference:.1f} ms "
+          f"at {saturated[0]['concurrency']} clients")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Performance benchmark suite for the KYP page and report generation.
+
+Measures, in this order:
+
+- cold: the first AppTest run of kyp_app.py in a fresh process, imports
+  included; the median over --cold-runs processes;
+- page: a warm start (new session, modules already loaded) and a rerun after a
+  widget change;
+- report: DOCX generation for small, typical and worst-case specs on both
+  backends. The worst case selects every fund as primary and comparison, has
+  very long notes and a fee table for two amounts.
+
+Each group runs in its own interpreter, and the page with pre-rendering off
+(KYP_PRERENDER=0), so no background render runs while anything is timed or
+traced. Warm timings record the fastest of --runs runs, the least noisy
+estimate of the cost, and the report cases take their runs in turn so a slow
+stretch of the machine hits all of them alike; report generation also records
+the tracemalloc peak of one report, and each group its process's max RSS.
+Each group also times a fixed pure-Python loop between its runs
+(<group>.calibration_ms); timings are scaled by how much faster or slower that
+loop ran than in the baseline, so a machine that is busier or throttled as a
+whole does not read as a regression.
+
+Results are written as JSON and compared with a stored baseline. A metric
+regresses when it is worse than the baseline by more than the tolerance and,
+for timings, by more than MIN_GATED_MS; regressions are measured once more and
+the suite exits non-zero only if the better of the two measurements still
+regresses:
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+APP_PATH = os.path.join(ROOT, "kyp_app.py")
+APP_TIMEOUT = 60
+
+# Metrics within this much of the baseline (0.30 = 30% slower) pass
+DEFAULT_TOLERANCE = 0.30
+# A timing also has to be this much slower than the baseline to fail; changes
+# of a few milliseconds are scheduler noise, not regressions
+MIN_GATED_MS = 5.0
+DEFAULT_RUNS = 20
+DEFAULT_COLD_RUNS = 5
+# Iterations of the calibration loop (roughly 20 ms)
+CALIBRATION_LOOPS = 200_000
+
+
+def _best_ms(samples):
+    return min(samples) * 1000
+
+
+def _calibrate():
+    start = time.perf_counter()
+    total = 0
+    for i in range(CALIBRATION_LOOPS):
+        total += i
+    return time.perf_counter() - start
+
+
+def bench_cold(runs):
+    """One first run of the page; main() takes the median over fresh processes."""
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    at = AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT).run()
+    cold = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"kyp_app.py raised during cold start: {at.exception[0].value}")
+    return {"page.cold_start_ms": cold * 1000}
+
+
+def bench_page(runs):
+    from streamlit.testing.v1 import AppTest
+
+    AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT).run()  # load modules and caches
+    warm, rerun, calibration = [], [], []
+    for i in range(runs):
+        calibration.append(_calibrate())
+        start = time.perf_counter()
+        at = AppTest.from_file(APP_PATH, default_timeout=APP_TIMEOUT).run()
+        warm.append(time.perf_counter() - start)
+
+        picker = at.multiselect[0]
+        picker.set_value([picker.options[i % len(picker.options)]])
+        start = time.perf_counter()
+        at.run()
+        rerun.append(time.perf_counter() - start)
+
+    return {
+        "page.warm_start_ms": _best_ms(warm),
+        "page.widget_rerun_ms": _best_ms(rerun),
+        "page.calibration_ms": _best_ms(calibration),
+    }
+
+
+def report_specs():
+    from bench_report import TYPICAL_SPEC
+    from kyp_funds import equities_texts, fixed_income_texts
+
+    long_note = ("Client discussed retirement timing, a planned home purchase and a family business sale. " * 250)
+    everything = {
+        "selected_equities": list(equities_texts),
+        "selected_fixed_income": list(fixed_income_texts),
+        "compare_equities": list(equities_texts),
+        "compare_fixed_income": list(fixed_income_texts),
+        "risk_need_notes": long_note,
+        "risk_ability_notes": long_note,
+        "risk_willingness_notes": long_note,
+        "risk_conclusion": long_note,
+        "investment_goals": long_note,
+        "recommendation_notes": long_note,
+        "fee_amounts": [100_000, 500_000],
+        "fee_contribution": 6_000,
+        "report_date": "2026-01-01",
+    }
+    return {
+        "small": {"report_date": "2026-01-01"},
+        "typical": dict(TYPICAL_SPEC, fee_amounts=[100_000]),
+        "worst": everything,
+    }
+
+
+def bench_reports(runs):
+    from kyp_report import BACKENDS, build_kyp_report
+
+    cases = [(name, spec, backend) for name, spec in report_specs().items() for backend in BACKENDS]
+    for _, spec, backend in cases:
+        build_kyp_report(spec, backend=backend)  # warm up caches
+    samples = {(name, backend): [] for name, _, backend in cases}
+    calibration = []
+    for _ in range(runs):
+        calibration.append(_calibrate())
+        for name, spec, backend in cases:
+            start = time.perf_counter()
+            build_kyp_report(spec, backend=backend)
+            samples[name, backend].append(time.perf_counter() - start)
+
+    results = {"report.calibration_ms": _best_ms(calibration)}
+    for name, spec, backend in cases:
+        tracemalloc.start()
+        size = len(build_kyp_report(spec, backend=backend))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[f"report.{name}.{backend}.ms"] = _best_ms(samples[name, backend])
+        results[f"report.{name}.{backend}.peak_kib"] = peak / 1024
+        results[f"report.{name}.{backend}.size_kib"] = size / 1024
+    return results
+
+
+PHASES = {"cold": bench_cold, "page": bench_page, "report": bench_reports}
+
+
+def max_rss_mib():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_phase(phase, runs):
+    """Run one benchmark group in a fresh interpreter and return its metrics."""
+    env = dict(os.environ, KYP_PRERENDER="0")
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--phase", phase, "--runs", str(runs)],
+                          stdout=subprocess.PIPE, text=True, check=True, env=env)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure(args):
+    """Run every benchmark group and return the merged metrics."""
+    metrics = {}
+    if not args.skip_page:
+        cold = [run_phase("cold", 1)["page.cold_start_ms"] for _ in range(args.cold_runs)]
+        metrics["page.cold_start_ms"] = statistics.median(cold)
+        metrics.update(run_phase("page", args.runs))
+    metrics.update(run_phase("report", args.runs))
+    return metrics
+
+
+def machine_speed(metric, results, baseline):
+    """How much slower the machine ran metric's group than in the baseline (1.0 = same)."""
+    calibration = metric.split(".")[0] + ".calibration_ms"
+    now = results["metrics"].get(calibration)
+    base = baseline.get("metrics", {}).get(calibration)
+    return now / base if now and base else 1.0
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression messages for metrics that got worse than the baseline allows."""
+    regressions = []
+    for metric, base in sorted(baseline.get("metrics", {}).items()):
+        value = results["metrics"].get(metric)
+        if value is None or metric.endswith((".size_kib", ".calibration_ms")) or base <= 0:
+            continue
+        note = ""
+        if metric.endswith("_ms") or metric.endswith(".ms"):
+            speed = machine_speed(metric, results, baseline)
+            if speed != 1.0:
+                value /= speed
+                note = f", machine speed x{speed:.2f}"
+            if value - base <= MIN_GATED_MS:
+                continue
+        if value > base * (1 + tolerance):
+            regressions.append(f"{metric}: {value:.2f} vs baseline {base:.2f} "
+                               f"(+{(value / base - 1) * 100:.0f}%{note})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help=f"timed runs per metric (default: {DEFAULT_RUNS})")
+    parser.add_argument("--cold-runs", type=int, default=DEFAULT_COLD_RUNS,
+                        help=f"fresh processes timed for the cold start (default: {DEFAULT_COLD_RUNS})")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown as a fraction (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--skip-page", action="store_true", help="skip the AppTest page benchmarks")
+    parser.add_argument("--phase", choices=PHASES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.phase:
+        # Child process of run_phase: print this group's metrics as one JSON line
+        metrics = PHASES[args.phase](args.runs)
+        rss = max_rss_mib()
+        if rss is not None and args.phase != "cold":
+            metrics[f"{args.phase}.max_rss_mib"] = rss
+        print(json.dumps(metrics))
+        return 0
+
+    metrics = measure(args)
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "cold_runs": args.cold_runs,
+        "metrics": metrics,
+    }
+    for metric, value in metrics.items():
+        print(f"{metric:36s} {value:10.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} possible regression(s); measuring again to confirm")
+        again = measure(args)
+        results["metrics"] = {metric: min(value, again.get(metric, value)) for metric, value in metrics.items()}
+        regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%} of the baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""Batch KYP report generation.
+
+Reads client specs from a CSV or JSONL file and renders one .docx per client
+across a process pool:
+
+    python kyp_batch.py clients.csv --out reports/ --workers 8
+
+or streams them into a single ZIP archive with a manifest, keeping memory flat
+however many clients are in the file:
+
+    python kyp_batch.py clients.csv --zip book.zip
+
+CSV columns and JSONL keys use the spec field names from kyp_report.DEFAULT_SPEC.
+In CSV files, fund lists are separated with ";".
+
+A spec that fails to render (an unknown fund, a malformed field, a JSONL line
+that is not valid JSON) does not stop the batch: it is reported by row number,
+recorded in the ZIP manifest, and the command exits with status 1 once every
+other report is written.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from kyp_report import BACKENDS, DEFAULT_BACKEND, build_kyp_report, normalize_spec
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def iter_specs(path):
+    """Yield client specs from a .csv or .jsonl file one at a time.
+
+    A JSONL line that cannot be parsed is yielded as its ValueError, in place of
+    the spec, so it fails as its own row instead of ending the batch.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield dict(row)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as exc:
+                        yield exc
+
+
+def read_specs(path):
+    """Load client specs from a .csv or .jsonl file."""
+    return list(iter_specs(path))
+
+
+def report_filename(index, spec):
+    client = re.sub(r"[^A-Za-z0-9_-]+", "_", str(spec.get("client_name") or "client")).strip("_")
+    return f"{index:05d}_{client or 'client'}_KYP_Analysis_Report.docx"
+
+
+def _error(exc):
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _build(spec, backend):
+    if isinstance(spec, Exception):  # unparseable line from iter_specs
+        raise spec
+    return build_kyp_report(spec, backend=backend)
+
+
+def _render_to_file(job):
+    index, spec, out_dir, backend = job
+    try:
+        data = _build(spec, backend)
+    except Exception as exc:
+        return None, 0, _error(exc)
+    # Named from the normalized spec, as in the ZIP manifest
+    path = os.path.join(out_dir, report_filename(index, normalize_spec(spec)))
+    with open(path, "wb") as f:
+        f.write(data)
+    return path, len(data), None
+
+
+def render_batch(specs, out_dir, workers=None, chunksize=16, backend=None):
+    """Render every spec into out_dir; returns a list of (path, size, error) in input order.
+
+    A spec that fails to render gets (None, 0, error message) and the batch
+    carries on.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(i, spec, out_dir, backend) for i, spec in enumerate(specs)]
+    if workers == 1:
+        return [_render_to_file(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_to_file, jobs, chunksize=chunksize))
+
+
+# ---------------------------
+# Streaming ZIP export
+# ---------------------------
+def _render(job):
+    spec, backend = job
+    try:
+        return _build(spec, backend), None
+    except Exception as exc:
+        return None, _error(exc)
+
+
+def iter_reports(specs, workers=None, backend=None, window=None):
+    """Yield (index, spec, docx bytes, error) in input order.
+
+    error is None for a rendered report; for a spec that failed it is the
+    error message and the bytes are None.
+
+    specs may be any iterable; at most `window` reports (default 4 per worker)
+    are in flight or waiting to be consumed at once, so memory does not grow
+    with the size of the batch.
+    """
+    if workers == 1:
+        for index, spec in enumerate(specs):
+            yield (index, spec) + _render((spec, backend))
+        return
+    workers = workers or os.cpu_count() or 1
+    window = window or 4 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for index, spec in enumerate(specs):
+            pending.append((index, spec, pool.submit(_render, (spec, backend))))
+            if len(pending) >= window:
+                index, spec, future = pending.popleft()
+                yield (index, spec) + future.result()
+        while pending:
+            index, spec, future = pending.popleft()
+            yield (index, spec) + future.result()
+
+
+def manifest_entry(index, spec, data):
+    spec = normalize_spec(spec)
+    return {
+        "file": report_filename(index, spec),
+        "client": spec["client_name"],
+        "profile": spec["final_risk_profile"],
+        "primary_funds": spec["selected_equities"] + spec["selected_fixed_income"],
+        "comparison_funds": spec["compare_equities"] + spec["compare_fixed_income"],
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "bytes": len(data),
+    }
+
+
+def failure_entry(index, spec, error):
+    return {
+        "file": None,
+        "row": index + 1,
+        "client": spec.get("client_name") if isinstance(spec, dict) else None,
+        "error": error,
+    }
+
+
+def _write_zip(specs, fileobj, workers=None, backend=None, progress=None):
+    # Generator core of export_zip: yields after each archive entry is written
+    # so iter_zip_chunks can hand the bytes on as they are produced.
+    count = failed = total_bytes = 0
+    with tempfile.TemporaryFile() as manifest, \
+            zipfile.ZipFile(fileobj, "w", zipfile.ZIP_STORED) as archive:
+        for index, spec, data, error in iter_reports(specs, workers=workers, backend=backend):
+            if error is None:
+                entry = manifest_entry(index, spec, data)
+                # .docx files are already deflated, so they are stored as-is.
+                archive.writestr(entry["file"], data)
+                count += 1
+                total_bytes += len(data)
+            else:
+                entry = failure_entry(index, spec, error)
+                failed += 1
+            manifest.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+            if progress:
+                progress(count + failed, entry)
+            yield
+        manifest.seek(0)
+        with archive.open(MANIFEST_NAME, "w") as dst:
+            shutil.copyfileobj(manifest, dst)
+    yield
+    return {"reports": count, "failed": failed, "bytes": total_bytes}
+
+
+def export_zip(specs, fileobj, workers=None, backend=None, progress=None):
+    """Render specs straight into a ZIP archive written to fileobj (a path or a binary file).
+
+    Reports are added as they finish and dropped immediately, and the manifest
+    (client, profile, funds, checksum per report) is spooled to a temporary
+    file and appended last. Specs that fail to render get a manifest entry
+    with "file": null, their row number and the error. progress(count,
+    manifest_entry) is called after each spec. Returns {"reports": n,
+    "failed": n, "bytes": total report bytes}.
+    """
+    writer = _write_zip(specs, fileobj, workers=workers, backend=backend, progress=progress)
+    while True:
+        try:
+            next(writer)
+        except StopIteration as done:
+            return done.value
+
+
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+
+def iter_zip_chunks(specs, workers=None, backend=None, progress=None):
+    """Yield the ZIP archive of export_zip as byte chunks, for chunked downloads."""
+    sink = _ChunkSink()
+    for _ in _write_zip(specs, sink, workers=workers, backend=backend, progress=progress):
+        if sink.chunks:
+            yield b"".join(sink.chunks)
+            sink.chunks.clear()
+    if sink.chunks:
+        yield b"".join(sink.chunks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render KYP Analysis reports for a batch of clients.")
+    parser.add_argument("specs", help="CSV or JSONL file of client specs")
+    parser.add_argument("--out", default="kyp_reports", help="output directory (default: kyp_reports)")
+    parser.add_argument("--zip", metavar="PATH", help="stream all reports and a manifest into one ZIP archive")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count; 1 renders in-process)")
+    parser.add_argument("--chunksize", type=int, default=16, help="specs sent to a worker at a time")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"rendering backend (default: {DEFAULT_BACKEND})")
+    args = parser.parse_args(argv)
+
+    if args.zip:
+        total = sum(1 for _ in iter_specs(args.specs))
+
+        def progress(count, entry):
+            if entry["file"] is None:
+                print(f"[{count}/{total}] row {entry['row']} failed: {entry['error']}", file=sys.stderr)
+            else:
+                print(f"[{count}/{total}] {entry['file']}", file=sys.stderr)
+
+        start = time.perf_counter()
+        summary = export_zip(iter_specs(args.specs), args.zip, workers=args.workers,
+                             backend=args.backend, progress=progress)
+        elapsed = time.perf_counter() - start
+        rate = summary["reports"] / elapsed if elapsed > 0 else float("inf")
+        print(f"Exported {summary['reports']} reports ({summary['bytes'] / 1024:.1f} KiB) to {args.zip} "
+              f"in {elapsed:.2f}s: {rate:.1f} reports/sec", file=sys.stderr)
+        if summary["failed"]:
+            print(f"{summary['failed']} spec(s) failed; see {MANIFEST_NAME} in {args.zip}", file=sys.stderr)
+            return 1
+        return 0
+
+    specs = read_specs(args.specs)
+    start = time.perf_counter()
+    results = render_batch(specs, args.out, workers=args.workers, chunksize=args.chunksize,
+                           backend=args.backend)
+    elapsed = time.perf_counter() - start
+
+    failures = [(index, error) for index, (_, _, error) in enumerate(results) if error is not None]
+    for index, error in failures:
+        print(f"Row {index + 1} failed: {error}", file=sys.stderr)
+    rendered = len(results) - len(failures)
+    total_bytes = sum(size for _, size, _ in results)
+    rate = rendered / elapsed if elapsed > 0 else float("inf")
+    print(f"Rendered {rendered} reports ({total_bytes / 1024:.1f} KiB) to {args.out} "
+          f"in {elapsed:.2f}s: {rate:.1f} reports/sec", file=sys.stderr)
+    if failures:
+        print(f"{len(failures)} spec(s) failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Fee-drag comparison for selected and comparison funds.
+
+For every fund, investment amount, gross return assumption and horizon the
+projected ending value is computed twice, with and without the fund's MER, as
+one broadcast NumPy expression over a (fund, amount, return, horizon) grid:
+
+    ending = amount * (1 + r - mer) ** years + contribution * annuity(r - mer, years)
+
+Fee drag is the gap between the two. Contributions are added at the end of
+each year.
+
+The page shows the grid long-form (one row per grid point). The report pivots
+horizons into columns, so its table has one row per fund, amount and return.
+"""
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from kyp_funds import get_catalog
+
+DEFAULT_AMOUNTS = (100_000.0,)
+DEFAULT_HORIZONS = (5, 10, 20, 30)
+DEFAULT_RETURNS = (4.0, 6.0, 8.0)
+
+# Report table columns before the one-per-horizon columns
+TABLE_HEADER = ("Fund", "Role", "MER", "Amount", "Return")
+
+
+def future_value(amount, rate, years, contribution=0.0):
+    """Future value of a lump sum plus level year-end contributions; broadcasts over arrays."""
+    growth = (1.0 + rate) ** years
+    safe_rate = np.where(rate == 0, 1.0, rate)
+    annuity = np.where(rate == 0, years, (growth - 1.0) / safe_rate)
+    return amount * growth + contribution * annuity
+
+
+@dataclass(frozen=True)
+class FeeComparison:
+    """Projected values over a (fund, amount, return, horizon) grid."""
+
+    funds: Tuple
+    roles: Tuple[str, ...]
+    mers: np.ndarray
+    amounts: np.ndarray
+    returns: np.ndarray
+    horizons: np.ndarray
+    contribution: float
+    gross: np.ndarray
+    ending: np.ndarray
+
+    @property
+    def drag(self):
+        return self.gross - self.ending
+
+    def columns(self):
+        """Long-form columns (one entry per grid point), in fund, amount, return, horizon order."""
+        f, a, r, h = np.indices(self.ending.shape).reshape(4, -1)
+        return {
+            "Fund": np.array([fund.name for fund in self.funds], dtype=object)[f],
+            "Role": np.array(self.roles, dtype=object)[f],
+            "MER (%)": self.mers[f],
+            "Amount": self.amounts[a],
+            "Return (%)": self.returns[r],
+            "Years": self.horizons[h],
+            "Ending Value": self.ending.ravel(),
+            "Fee Drag": self.drag.ravel(),
+        }
+
+    def table_header(self):
+        """TABLE_HEADER plus one column per horizon, for the report."""
+        return TABLE_HEADER + tuple(f"{int(years)} Years" for years in self.horizons)
+
+    def table_rows(self):
+        """Formatted rows matching table_header(), in fund, amount, return order.
+
+        Each horizon cell holds the ending value and, on a second line, the fee drag.
+        """
+        f, a, r = np.indices(self.ending.shape[:3]).reshape(3, -1)
+        names = [fund.name for fund in self.funds]
+        ending = self.ending.reshape(len(f), -1)
+        drag = self.drag.reshape(len(f), -1)
+        return [
+            (names[fi], self.roles[fi], f"{self.mers[fi]:.2f}%", f"${self.amounts[ai]:,.0f}",
+             f"{self.returns[ri]:g}%",
+             *(f"${value:,.0f}\n${fees:,.0f} fees" for value, fees in zip(ending_row, drag_row)))
+            for fi, ai, ri, ending_row, drag_row in zip(f.tolist(), a.tolist(), r.tolist(), ending, drag)
+        ]
+
+
+def compare_fees(primary, comparison=(), amounts=DEFAULT_AMOUNTS, horizons=DEFAULT_HORIZONS,
+                 returns=DEFAULT_RETURNS, contribution=0.0, catalog=None):
+    """Project ending values and fee drag for fund names in primary and comparison.
+
+    Funds selected in both lists are reported once as Primary; funds without a
+    MER in the catalog are left out.
+    """
+    catalog = catalog or get_catalog()
+    funds, roles, seen = [], [], set()
+    for role, names in (("Primary", primary), ("Comparison", comparison)):
+        for name in names:
+            fund = catalog.by_name(name)
+            if fund is None:
+                raise ValueError(f"Unknown fund: {name}")
+            if fund.mer is not None and fund.code not in seen:
+                funds.append(fund)
+                roles.append(role)
+                seen.add(fund.code)
+
+    mers = np.array([fund.mer for fund in funds], dtype=float)
+    amounts = np.asarray(amounts, dtype=float)
+    returns = np.asarray(returns, dtype=float)
+    horizons = np.asarray(horizons, dtype=float)
+
+    mer = mers[:, None, None, None] / 100.0
+    amount = amounts[None, :, None, None]
+    rate = returns[None, None, :, None] / 100.0
+    years = horizons[None, None, None, :]
+    gross = np.broadcast_to(future_value(amount, rate, years, contribution),
+                            (len(mers), len(amounts), len(returns), len(horizons)))
+    ending = future_value(amount, rate - mer, years, contribution)
+    return FeeComparison(tuple(funds), tuple(roles), mers, amounts, returns, horizons,
+                         float(contribution), gross, ending)
@@ -0,0 +1,153 @@
+"""Fund catalog.
+
+Fund records live in data/funds.json (code, name, asset class, provider,
+ticker, MER in percent, holdings count) and the report prose for each fund in
+data/fund_texts.json, keyed by fund code. Records are indexed by code, name and
+asset class when the catalog loads; the prose file is only read the first time
+a fund text is needed. Both files are reloaded when their mtime changes, so
+catalog edits show up without restarting the server.
+
+equities_texts and fixed_income_texts are read-only name -> prose mappings over
+the current catalog, for code that only needs the text of a fund.
+"""
+import json
+import os
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Optional
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CATALOG_PATH = os.environ.get("KYP_FUND_CATALOG", os.path.join(DATA_DIR, "funds.json"))
+TEXTS_PATH = os.environ.get("KYP_FUND_TEXTS", os.path.join(DATA_DIR, "fund_texts.json"))
+
+ASSET_CLASSES = ("equities", "fixed_income")
+
+# How often (seconds) the catalog files are stat'ed for changes
+RELOAD_CHECK_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class Fund:
+    code: str
+    name: str
+    asset_class: str
+    provider: str
+    ticker: Optional[str] = None
+    mer: Optional[float] = None
+    holdings: Optional[int] = None
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class FundCatalog:
+    """A loaded catalog file, indexed by code, name and asset class, with lazily loaded prose."""
+
+    def __init__(self, path=CATALOG_PATH, texts_path=TEXTS_PATH):
+        self.path = path
+        self.texts_path = texts_path
+        self.mtime = _mtime(path)
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f)
+
+        funds = []
+        for record in records:
+            fund = Fund(**record)
+            if fund.asset_class not in ASSET_CLASSES:
+                raise ValueError(f"Fund {fund.code} has unknown asset class '{fund.asset_class}'")
+            funds.append(fund)
+        self.funds = tuple(funds)
+        self._by_code = {fund.code: fund for fund in self.funds}
+        self._by_name = {fund.name: fund for fund in self.funds}
+        if len(self._by_code) != len(self.funds) or len(self._by_name) != len(self.funds):
+            raise ValueError(f"Duplicate fund code or name in {path}")
+        self._by_asset_class = {
+            asset_class: tuple(fund for fund in self.funds if fund.asset_class == asset_class)
+            for asset_class in ASSET_CLASSES
+        }
+
+        self._texts = None
+        self._texts_mtime = None
+        self._texts_lock = threading.Lock()
+
+    @property
+    def version(self):
+        """Changes whenever the catalog or prose file changes on disk; use it in cache keys."""
+        return (self.mtime, _mtime(self.texts_path))
+
+    def get(self, code):
+        return self._by_code.get(code)
+
+    def by_name(self, name):
+        return self._by_name.get(name)
+
+    def by_asset_class(self, asset_class):
+        return self._by_asset_class.get(asset_class, ())
+
+    def names(self, asset_class):
+        return [fund.name for fund in self.by_asset_class(asset_class)]
+
+    def text(self, code):
+        """Return the report prose for a fund code, loading the prose file on first use."""
+        texts = self._texts
+        if texts is None or self._texts_mtime != _mtime(self.texts_path):
+            with self._texts_lock:
+                mtime = _mtime(self.texts_path)
+                if self._texts is None or self._texts_mtime != mtime:
+                    with open(self.texts_path, encoding="utf-8") as f:
+                        self._texts = json.load(f)
+                    self._texts_mtime = mtime
+                texts = self._texts
+        return texts[code]
+
+
+_catalog = None
+_catalog_checked = 0.0
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Return the current catalog, reloading it if data/funds.json has changed on disk."""
+    global _catalog, _catalog_checked
+    now = time.monotonic()
+    catalog = _catalog
+    if catalog is not None and now - _catalog_checked < RELOAD_CHECK_INTERVAL:
+        return catalog
+    with _catalog_lock:
+        if _catalog is None or _catalog.mtime != _mtime(_catalog.path):
+            _catalog = FundCatalog()
+        _catalog_checked = now
+        return _catalog
+
+
+class _TextView(Mapping):
+    # Fund name -> prose for one asset class of the current catalog.
+    def __init__(self, asset_class):
+        self.asset_class = asset_class
+
+    def __getitem__(self, name):
+        catalog = get_catalog()
+        fund = catalog.by_name(name)
+        if fund is None or fund.asset_class != self.asset_class:
+            raise KeyError(name)
+        return catalog.text(fund.code)
+
+    def __contains__(self, name):
+        fund = get_catalog().by_name(name)
+        return fund is not None and fund.asset_class == self.asset_class
+
+    def __iter__(self):
+        return iter(get_catalog().names(self.asset_class))
+
+    def __len__(self):
+        return len(get_catalog().by_asset_class(self.asset_class))
+
+
+equities_texts = _TextView("equities")
+fixed_income_texts = _TextView("fixed_income")
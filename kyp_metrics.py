@@ -0,0 +1,267 @@
+"""Lightweight timing spans, counters and gauges for the report hot path.
+
+Instrumentation is off unless KYP_METRICS is set. While it is off, span() and
+start() hand back one shared no-op object and count()/set_gauge() return at
+once, so the calls left in the hot path cost a function call each.
+
+When it is on, every span and counter update is written as one JSON line to
+the "kyp.metrics" logger (KYP_METRICS_LOG names a file; stderr otherwise), and
+the aggregates are exposed in the Prometheus text format:
+
+- KYP_METRICS_FILE: a text file rewritten by flush(), at most once per
+  FLUSH_INTERVAL seconds and at exit (node_exporter textfile style);
+- KYP_METRICS_PORT: a local HTTP endpoint serving /metrics, started by serve().
+
+Spans are recorded as the kyp_span_seconds histogram, labelled with the span
+name; counters and gauges are prefixed with kyp_.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("KYP_METRICS", "").lower() not in ("", "0", "false", "no")
+LOG_PATH = os.environ.get("KYP_METRICS_LOG")
+TEXTFILE_PATH = os.environ.get("KYP_METRICS_FILE")
+PORT = int(os.environ.get("KYP_METRICS_PORT", "0") or 0)
+
+# Seconds between rewrites of the Prometheus text file
+FLUSH_INTERVAL = 5.0
+
+# Upper bounds of the span histogram buckets, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = "kyp_"
+
+logger = logging.getLogger("kyp.metrics")
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+_last_flush = 0.0
+_session_ids = itertools.count(1)
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _log(event, name, **fields):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"ts": round(time.time(), 6), "event": event, "name": name, **fields}))
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def stop(self):
+        return 0.0
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Times one phase; use as a context manager or call stop() once."""
+
+    __slots__ = ("name", "labels", "_start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self._start = time.perf_counter()
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def stop(self):
+        seconds = time.perf_counter() - self._start
+        observe(self.name, seconds, **self.labels)
+        return seconds
+
+
+def span(name, **labels):
+    """Context manager timing a block as the span `name`."""
+    if not ENABLED:
+        return _NULL_SPAN
+    return Span(name, labels)
+
+
+def start(name, **labels):
+    """Start timing the span `name` now; call stop() on the result to record it."""
+    if not ENABLED:
+        return _NULL_SPAN
+    return Span(name, labels)
+
+
+def observe(name, seconds, **labels):
+    """Record a span duration measured elsewhere."""
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+        counts = histogram[0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                counts[i] += 1
+                break
+        histogram[1] += seconds
+        histogram[2] += 1
+    _log("span", name, seconds=round(seconds, 6), **labels)
+
+
+def count(name, value=1, **labels):
+    """Add value to the counter `name`."""
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _log("count", name, value=value, **labels)
+
+
+def set_gauge(name, value, **labels):
+    if not ENABLED:
+        return
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+
+def new_session(owner):
+    """Return a session label for per-session gauges, dropped once owner is garbage collected."""
+    session = str(next(_session_ids))
+    weakref.finalize(owner, _drop_session, session)
+    return session
+
+
+def _drop_session(session):
+    with _lock:
+        for key in [key for key in _gauges if ("session", session) in key[1]]:
+            del _gauges[key]
+
+
+# ---------------------------
+# Prometheus text exposition
+# ---------------------------
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def render():
+    """Return all metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted((key, (list(h[0]), h[1], h[2])) for key, h in _histograms.items())
+
+    lines = []
+    declared = set()
+
+    def declare(name, kind):
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        metric = PREFIX + name
+        declare(metric, "counter")
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    for (name, labels), value in gauges:
+        metric = PREFIX + name
+        declare(metric, "gauge")
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+    metric = PREFIX + "span_seconds"
+    for (name, labels), (counts, total, n) in histograms:
+        declare(metric, "histogram")
+        labels = (("span", name),) + labels
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, counts):
+            cumulative += bucket
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+        lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {n}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    # Write then rename, so a scraper never reads a half-written file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def flush(force=False):
+    """Rewrite KYP_METRICS_FILE if it is set and FLUSH_INTERVAL has passed."""
+    global _last_flush
+    if not ENABLED or not TEXTFILE_PATH:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    write_textfile(TEXTFILE_PATH)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=None, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread and return the server, or None when disabled."""
+    port = port if port is not None else PORT
+    if not ENABLED or not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="kyp-metrics", daemon=True).start()
+    return server
+
+
+if ENABLED:
+    if not logger.handlers:
+        handler = logging.FileHandler(LOG_PATH, encoding="utf-8") if LOG_PATH else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    atexit.register(flush, force=True)
@@ -0,0 +1,202 @@
+"""Direct OOXML backend: writes the .docx package without the python-docx object model.
+
+Every report shares the same package parts apart from word/document.xml (styles,
+numbering, theme, settings, ...). Those parts are taken once per process from
+the styled python-docx base template and kept as a pre-compressed ZIP; each
+report copies that archive, appends a document.xml assembled from pre-escaped
+XML string templates, and lets zipfile rewrite the central directory.
+
+The paragraph markup mirrors what python-docx emits for add_heading and
+add_paragraph, so the output is equivalent to the python-docx backend.
+"""
+import re
+import threading
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+import kyp_metrics
+
+DOCUMENT_PART = "word/document.xml"
+
+# Style names used by the report layout, mapped to their ids in the template.
+# Like python-docx, an explicit default style leaves an empty w:pPr and no
+# style at all leaves no w:pPr.
+STYLE_IDS = {
+    "Normal": None,
+    "List Bullet": "ListBullet",
+    "List Bullet 2": "ListBullet2",
+    "Title": "Title",
+    "Heading 1": "Heading1",
+    "Heading 2": "Heading2",
+    "Heading 3": "Heading3",
+}
+TABLE_STYLE_IDS = {
+    "Table Grid": "TableGrid",
+}
+
+EMUS_PER_TWIP = 635
+TABLE_LOOK = ('<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+              'w:noHBand="0" w:noVBand="1" w:val="04A0"/>')
+
+# Characters XML 1.0 does not allow; python-docx (lxml) rejects text containing
+# them with this ValueError, so the backends fail alike instead of this one
+# writing a document.xml Word cannot open
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+INVALID_TEXT_MESSAGE = "All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters"
+
+_package_lock = threading.Lock()
+_package = None
+_fragments = {}
+
+
+def _text_xml(chunk):
+    if _INVALID_XML_CHARS.search(chunk):
+        raise ValueError(INVALID_TEXT_MESSAGE)
+    if len(chunk.strip()) < len(chunk):
+        return f'<w:t xml:space="preserve">{escape(chunk)}</w:t>'
+    return f"<w:t>{escape(chunk)}</w:t>"
+
+
+def _run_xml(text):
+    # Same run content python-docx produces: tabs become w:tab, CR/LF become
+    # w:br, and runs of plain characters share one w:t.
+    parts = []
+    buffer = []
+
+    def flush():
+        chunk = "".join(buffer)
+        if chunk:
+            parts.append(_text_xml(chunk))
+        buffer.clear()
+
+    for char in text:
+        if char == "\t":
+            flush()
+            parts.append("<w:tab/>")
+        elif char in "\r\n":
+            flush()
+            parts.append("<w:br/>")
+        else:
+            buffer.append(char)
+    flush()
+    return "<w:r>" + "".join(parts) + "</w:r>" if parts else "<w:r/>"
+
+
+def paragraph_xml(text="", style=None):
+    """Return the w:p markup for a paragraph of text in the named style."""
+    if style is None:
+        ppr = ""
+    elif style not in STYLE_IDS:
+        raise ValueError(f"Style '{style}' is not available in the OOXML backend")
+    elif STYLE_IDS[style] is None:
+        ppr = "<w:pPr/>"
+    else:
+        ppr = f'<w:pPr><w:pStyle w:val="{STYLE_IDS[style]}"/></w:pPr>'
+    if not text:
+        return f"<w:p>{ppr}</w:p>" if ppr else "<w:p/>"
+    return f"<w:p>{ppr}{_run_xml(text)}</w:p>"
+
+
+class XmlBody:
+    """Collects document.xml body markup through the same calls the layout makes on a Document."""
+
+    def __init__(self):
+        self.parts = []
+
+    def add_heading(self, text="", level=1):
+        self.parts.append(paragraph_xml(text, "Title" if level == 0 else f"Heading {level}"))
+
+    def add_paragraph(self, text="", style=None):
+        self.parts.append(paragraph_xml(text, style))
+
+    def add_table_rows(self, header, rows, style):
+        self.parts.append(table_xml(header, rows, style, _package[3]))
+
+    def fragment(self, key, build):
+        xml = _fragments.get(key)
+        if xml is None:
+            scratch = XmlBody()
+            build(scratch)
+            xml = _fragments[key] = "".join(scratch.parts)
+        self.parts.append(xml)
+
+
+def table_xml(header, rows, style, block_width):
+    """Return the w:tbl markup python-docx writes for add_table plus cell.text on every cell.
+
+    block_width is the text width of the section in EMU; columns share it equally.
+    """
+    if style not in TABLE_STYLE_IDS:
+        raise ValueError(f"Table style '{style}' is not available in the OOXML backend")
+    cols = len(header)
+    col_width = int(round((block_width // cols) / EMUS_PER_TWIP))
+    tc_pr = f'<w:tcPr><w:tcW w:type="dxa" w:w="{col_width}"/></w:tcPr>'
+    parts = [
+        f'<w:tbl><w:tblPr><w:tblStyle w:val="{TABLE_STYLE_IDS[style]}"/><w:tblW w:type="auto" w:w="0"/>',
+        TABLE_LOOK,
+        "</w:tblPr><w:tblGrid>",
+        f'<w:gridCol w:w="{col_width}"/>' * cols,
+        "</w:tblGrid>",
+    ]
+    for values in (header, *rows):
+        parts.append("<w:tr>")
+        for value in values:
+            parts.append(f"<w:tc>{tc_pr}<w:p>{_run_xml(value)}</w:p></w:tc>")
+        parts.append("</w:tr>")
+    parts.append("</w:tbl>")
+    return "".join(parts)
+
+
+def _fragment(doc, key, build):
+    doc.fragment(key, build)
+
+
+def _load_package():
+    """Split the styled base template into (static zip bytes, document.xml head, tail, text width)."""
+    global _package
+    with _package_lock:
+        if _package is None:
+            from kyp_report import _new_base_document
+
+            template = BytesIO()
+            _new_base_document().save(template)
+            static = BytesIO()
+            with zipfile.ZipFile(template) as src, \
+                    zipfile.ZipFile(static, "w", zipfile.ZIP_DEFLATED) as dst:
+                for info in src.infolist():
+                    if info.filename == DOCUMENT_PART:
+                        document_xml = src.read(info).decode("utf-8")
+                    else:
+                        dst.writestr(info.filename, src.read(info))
+            body_start = document_xml.index("<w:body>") + len("<w:body>")
+            body_end = document_xml.index("<w:sectPr")
+            tail = document_xml[body_end:]
+            page_width = int(re.search(r'<w:pgSz w:w="(\d+)"', tail).group(1))
+            margins = re.search(r'<w:pgMar [^>]*w:right="(\d+)"[^>]*w:left="(\d+)"', tail)
+            block_width = (page_width - int(margins.group(1)) - int(margins.group(2))) * EMUS_PER_TWIP
+            _package = (static.getvalue(), document_xml[:body_start], tail, block_width)
+    return _package
+
+
+def build_document_xml(spec):
+    """Return word/document.xml for a spec."""
+    from kyp_report import normalize_spec, write_report
+
+    _, head, tail, _ = _package or _load_package()
+    body = XmlBody()
+    write_report(body, normalize_spec(spec), _fragment)
+    return head + "".join(body.parts) + tail
+
+
+def build_kyp_report(spec):
+    """Render a KYP Analysis report for a spec and return the .docx bytes."""
+    with kyp_metrics.span("build_document", backend="ooxml"):
+        document_xml = build_document_xml(spec)
+    with kyp_metrics.span("save", backend="ooxml"):
+        static = _package[0]
+        buffer = BytesIO()
+        buffer.write(static)
+        with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED) as package:
+            package.writestr(DOCUMENT_PART, document_xml)
+        return buffer.getvalue()
@@ -0,0 +1,97 @@
+"""Speculative background rendering of the report for the page's current inputs.
+
+Each Streamlit session owns a PrerenderSession. Once the user has changed an
+input (see kyp_app.py), every script run schedules the current spec under its
+input hash; the render starts after the inputs have been stable for the
+debounce delay, on a thread pool shared by all sessions.
+A newer spec cancels the previous one: a pending debounce timer or a queued
+render is dropped outright, and a render that already started is simply
+ignored. When Generate is pressed, result() returns the pre-rendered bytes
+immediately if the inputs have not changed or waits for an in-flight render.
+A render that has not started yet (still debouncing or queued behind other
+sessions) is dropped and result() returns None, so the caller renders on its
+own thread instead of waiting on the shared pool.
+"""
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from kyp_report import build_kyp_report
+
+PRERENDER_WORKERS = 2
+DEBOUNCE_SECONDS = 0.75
+
+
+def new_executor(workers=PRERENDER_WORKERS):
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kyp-prerender")
+
+
+class PrerenderSession:
+    """Holds at most one scheduled or finished speculative render for a session."""
+
+    def __init__(self, executor, render=build_kyp_report, debounce=DEBOUNCE_SECONDS):
+        self._executor = executor
+        self._render = render
+        self._debounce = debounce
+        self._lock = threading.Lock()
+        self._key = None
+        self._spec = None
+        self._timer = None
+        self._future = None
+
+    def _cancel(self):
+        # Caller holds the lock
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def _fire(self, key):
+        with self._lock:
+            # Skip if a newer spec or result() replaced this timer while it fired
+            if self._key != key or self._timer is not threading.current_thread():
+                return
+            self._timer = None
+            try:
+                self._future = self._executor.submit(self._render, self._spec)
+            except RuntimeError:
+                # The pool was shut down (interpreter or server exit); drop the render
+                pass
+
+    def schedule(self, key, spec):
+        """Render spec in the background once it has been stable for the debounce delay."""
+        with self._lock:
+            if key == self._key:
+                return
+            self._cancel()
+            self._key = key
+            self._spec = spec
+            self._timer = threading.Timer(self._debounce, self._fire, args=(key,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def held(self):
+        """Return the finished render this session holds, or None."""
+        with self._lock:
+            future = self._future
+        if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def result(self, key, timeout=None):
+        """Return the report bytes for key, or None if its render has not started."""
+        with self._lock:
+            if key != self._key:
+                return None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            future = self._future
+            if future is None or future.cancel():
+                self._future = None
+                return None
+        try:
+            return future.result(timeout)
+        except CancelledError:
+            return None
@@ -0,0 +1,343 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from io import BytesIO
+
+import kyp_metrics
+from kyp_fees import DEFAULT_HORIZONS, DEFAULT_RETURNS, compare_fees
+from kyp_funds import equities_texts, fixed_income_texts
+
+# ---------------------------
+# Report specification
+# ---------------------------
+# A spec is a plain dict holding the same inputs the Streamlit page collects.
+# Missing keys fall back to the defaults below, so a batch file only needs the
+# columns that differ from client to client.
+DEFAULT_SPEC = {
+    "selected_equities": [],
+    "selected_fixed_income": [],
+    "compare_equities": [],
+    "compare_fixed_income": [],
+    "risk_need": "High",
+    "risk_need_notes": "",
+    "risk_ability": "High",
+    "risk_ability_notes": "",
+    "risk_willingness": "High",
+    "risk_willingness_notes": "",
+    "final_risk_profile": "Aggressive",
+    "risk_conclusion": "",
+    "client_name": "Xavier",
+    "investment_goals": "Long-term growth, able to stomach market fluctuations.",
+    "risk_tolerance": "High",
+    "account_type": "TFSA",
+    "primary_fund_recommendation": "DFA Global Equity Portfolio F (DFA607)",
+    "recommendation_notes": "The primary recommendation is based on the client's preference for evidence-based, low-cost solutions.",
+    "report_date": None,
+    # Fee comparison grid; the section is left out while fee_amounts is empty
+    "fee_amounts": [],
+    "fee_horizons": list(DEFAULT_HORIZONS),
+    "fee_returns": list(DEFAULT_RETURNS),
+    "fee_contribution": 0.0,
+}
+
+# Rendering backends: "docx" builds through python-docx, "ooxml" writes the
+# package directly (kyp_ooxml). KYP_REPORT_BACKEND sets the default.
+BACKENDS = ("docx", "ooxml")
+DEFAULT_BACKEND = os.environ.get("KYP_REPORT_BACKEND", "docx")
+
+FUND_LIST_FIELDS = ("selected_equities", "selected_fixed_income", "compare_equities", "compare_fixed_income")
+FEE_GRID_FIELDS = {"fee_amounts": float, "fee_horizons": int, "fee_returns": float}
+
+TABLE_STYLE = 'Table Grid'
+
+# ---------------------------
+# Advisor prompts repeated in the report
+# ---------------------------
+NEED_PROMPTS = (
+    "- Does the client need higher returns to meet their financial goals?\n"
+    "- What is their required return to achieve financial goals (retirement, wealth accumulation)?\n"
+    "- Do they have guaranteed income (pension, CPP, OAS, annuities)?\n"
+    "- How flexible is their spending (can they reduce expenses if needed)?\n"
+    "- Do they prioritize wealth accumulation or capital preservation?"
+)
+ABILITY_PROMPTS = (
+    "- What is the client's investment time horizon?\n"
+    "- Will they rely on portfolio withdrawals soon?\n"
+    "- Do they have liquidity needs?\n"
+    "- How stable are other income sources?"
+)
+WILLINGNESS_PROMPTS = (
+    "- How did the client react to past market downturns?\n"
+    "- What is their investment experience and knowledge level?\n"
+    "- How comfortable are they with volatility?\n"
+    "- What are their expectations regarding risk vs. return?\n"
+    "- Do they prioritize stability or maximizing returns?"
+)
+
+
+def normalize_spec(spec):
+    """Return a complete spec: defaults filled in, fund lists as lists, date set."""
+    full = dict(DEFAULT_SPEC)
+    full.update({k: v for k, v in spec.items() if v is not None})
+    for field in FUND_LIST_FIELDS:
+        value = full[field]
+        if isinstance(value, str):
+            value = [name.strip() for name in value.split(";") if name.strip()]
+        full[field] = list(value)
+    for field, cast in FEE_GRID_FIELDS.items():
+        value = full[field]
+        if isinstance(value, str):
+            value = [item for item in value.split(";") if item.strip()]
+        full[field] = [cast(item) for item in value]
+    full["fee_contribution"] = float(full["fee_contribution"] or 0.0)
+    if not full["report_date"]:
+        full["report_date"] = datetime.now().strftime("%Y-%m-%d")
+    for field in ("selected_equities", "compare_equities"):
+        unknown = [fund for fund in full[field] if fund not in equities_texts]
+        if unknown:
+            raise ValueError(f"Unknown equities fund(s) in {field}: {', '.join(unknown)}")
+    for field in ("selected_fixed_income", "compare_fixed_income"):
+        unknown = [fund for fund in full[field] if fund not in fixed_income_texts]
+        if unknown:
+            raise ValueError(f"Unknown fixed income fund(s) in {field}: {', '.join(unknown)}")
+    return full
+
+
+def spec_key(spec):
+    """Return a stable SHA-256 hex digest of a spec's inputs, for caching reports."""
+    canonical = json.dumps(normalize_spec(spec), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ---------------------------
+# Base template and precompiled fragments
+# ---------------------------
+# Building a styled Document and resolving paragraph styles by name is most of
+# the python-docx cost. Each thread keeps one styled base document and resets
+# its body per report; static blocks (headings, advisor prompts, fund sections)
+# are compiled to body XML once per process and spliced in as copies, so only
+# client-specific paragraphs go through add_paragraph.
+#
+# python-docx is imported by the first report, not with this module, so the
+# page starts without it.
+_SECT_PR = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}sectPr"
+_local = threading.local()
+_fragments = {}
+_fragment_lock = threading.Lock()
+_scratch = None
+
+
+def _new_base_document():
+    import docx
+    from docx.shared import Pt
+
+    # Create a new Word document
+    doc = docx.Document()
+
+    # Set the default style font
+    style = doc.styles['Normal']
+    font = style.font
+    font.name = 'Calibri'
+    font.size = Pt(11)
+    return doc
+
+
+def _clear_body(doc):
+    # lxml detaches an element in time that grows faster than its subtree, so
+    # a large table is emptied row by row before it is removed (10s -> 30ms
+    # for a 2,400-row table)
+    body = doc.element.body
+    for child in list(body):
+        if child.tag != _SECT_PR:
+            for grandchild in list(child):
+                child.remove(grandchild)
+            body.remove(child)
+
+
+def _base_document():
+    doc = getattr(_local, "doc", None)
+    if doc is None:
+        doc = _local.doc = _new_base_document()
+    else:
+        _clear_body(doc)
+    return doc
+
+
+def _compile_fragment(key, build):
+    global _scratch
+    with _fragment_lock:
+        elements = _fragments.get(key)
+        if elements is None:
+            if _scratch is None:
+                _scratch = _new_base_document()
+            _clear_body(_scratch)
+            build(_scratch)
+            body = _scratch.element.body
+            elements = tuple(child for child in body if child.tag != _SECT_PR)
+            # Detach only: _clear_body would empty the elements being cached
+            for element in elements:
+                body.remove(element)
+            _fragments[key] = elements
+    return elements
+
+
+def _cached_fragment(doc, key, build):
+    """Append a static block to doc from the fragment cache, compiling it on first use."""
+    elements = _fragments.get(key) or _compile_fragment(key, build)
+    body = doc.element.body
+    sectPr = body.sectPr
+    for element in elements:
+        if sectPr is None:
+            body.append(copy.deepcopy(element))
+        else:
+            sectPr.addprevious(copy.deepcopy(element))
+
+
+def _inline_fragment(doc, key, build):
+    build(doc)
+
+
+# ---------------------------
+# Report layout
+# ---------------------------
+# The layout is written against a small document interface (add_heading,
+# add_paragraph) plus a fragment(doc, key, build) callable for static blocks,
+# so the python-docx and direct OOXML backends share it.
+def _heading(doc, text, level, fragment):
+    fragment(doc, ("heading", text, level), lambda d: d.add_heading(text, level=level))
+
+
+def _add_fund_group(doc, label, funds, texts, fragment):
+    if funds:
+        fragment(doc, ("bullet", label), lambda d: d.add_paragraph(label, style='List Bullet'))
+        for fund in funds:
+            def build(d, fund=fund):
+                d.add_paragraph(f"{fund}:", style='List Bullet 2')
+                d.add_paragraph(texts[fund], style='Normal')
+            fragment(doc, ("fund", fund, texts[fund]), build)
+
+
+def _add_table(doc, header, rows):
+    # XmlBody writes tables in one call; a python-docx Document is filled cell by cell.
+    add_table_rows = getattr(doc, "add_table_rows", None)
+    if add_table_rows is not None:
+        add_table_rows(header, rows, style=TABLE_STYLE)
+        return
+    table = doc.add_table(rows=len(rows) + 1, cols=len(header), style=TABLE_STYLE)
+    for row, values in zip(table.rows, [header, *rows]):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+
+
+def _add_fee_comparison(doc, spec, fragment):
+    primary = spec["selected_equities"] + spec["selected_fixed_income"]
+    comparison = spec["compare_equities"] + spec["compare_fixed_income"]
+    fees = compare_fees(primary, comparison, amounts=spec["fee_amounts"], horizons=spec["fee_horizons"],
+                        returns=spec["fee_returns"], contribution=spec["fee_contribution"])
+    if not fees.funds:
+        return
+    _heading(doc, "Fee Comparison", 3, fragment)
+    assumptions = ("For each horizon: the projected ending value after MER and, below it, the fee drag "
+                   "against the same return with no fees")
+    if spec["fee_contribution"]:
+        assumptions += f", with ${spec['fee_contribution']:,.0f} contributed at the end of each year"
+    doc.add_paragraph(assumptions + ".")
+    _add_table(doc, fees.table_header(), fees.table_rows())
+
+
+def _add_risk_factor(doc, heading, assessment, prompts, notes, fragment):
+    _heading(doc, heading, 3, fragment)
+    doc.add_paragraph(f"Assessment: {assessment}")
+
+    def build(d):
+        d.add_paragraph("Advisor Notes:")
+        d.add_paragraph(prompts, style='List Bullet')
+    fragment(doc, ("prompts", heading), build)
+    doc.add_paragraph(f"Additional Notes: {notes}")
+
+
+def write_report(doc, spec, fragment):
+    """Write the report body for a normalized spec into doc."""
+    # Title & Date
+    _heading(doc, "KYP Analysis Report", 1, fragment)
+    doc.add_paragraph(f"Date: {spec['report_date']}")
+    doc.add_paragraph("")
+
+    # Section 1: Fund Selection
+    _heading(doc, "1. Fund Selection", 2, fragment)
+    _heading(doc, "Primary Fund Selection", 3, fragment)
+    _add_fund_group(doc, "Equities:", spec["selected_equities"], equities_texts, fragment)
+    _add_fund_group(doc, "Fixed Income:", spec["selected_fixed_income"], fixed_income_texts, fragment)
+
+    _heading(doc, "Fund Comparison", 3, fragment)
+    _add_fund_group(doc, "Equities Comparison:", spec["compare_equities"], equities_texts, fragment)
+    _add_fund_group(doc, "Fixed Income Comparison:", spec["compare_fixed_income"], fixed_income_texts, fragment)
+    if spec["fee_amounts"]:
+        _add_fee_comparison(doc, spec, fragment)
+
+    # Section 2: Risk Evaluation Framework
+    _heading(doc, "2. Risk Evaluation Framework", 2, fragment)
+    _add_risk_factor(doc, "Need to Take Risk (Financial Need for Growth)",
+                     spec["risk_need"], NEED_PROMPTS, spec["risk_need_notes"], fragment)
+    _add_risk_factor(doc, "Ability to Take Risk (Time Horizon & Financial Stability)",
+                     spec["risk_ability"], ABILITY_PROMPTS, spec["risk_ability_notes"], fragment)
+    _add_risk_factor(doc, "Willingness to Take Risk (Behavioral & Emotional Tolerance)",
+                     spec["risk_willingness"], WILLINGNESS_PROMPTS, spec["risk_willingness_notes"], fragment)
+
+    _heading(doc, "Final Risk Profile Recommendation", 3, fragment)
+    doc.add_paragraph(f"Assessment: {spec['final_risk_profile']}")
+    doc.add_paragraph(f"Final Notes: {spec['risk_conclusion']}")
+
+    # Section 3: Client-Specific Recommendation
+    _heading(doc, "3. Client-Specific Recommendation", 2, fragment)
+    doc.add_paragraph(f"Client Name: {spec['client_name']}")
+    doc.add_paragraph(f"Investment Goals: {spec['investment_goals']}")
+    doc.add_paragraph(f"Risk Tolerance: {spec['risk_tolerance']}")
+    doc.add_paragraph(f"Account Type: {spec['account_type']}")
+    doc.add_paragraph(f"Primary Fund Recommended: {spec['primary_fund_recommendation']}")
+    doc.add_paragraph(f"Recommendation Notes: {spec['recommendation_notes']}")
+
+
+def build_kyp_document(spec, cached=True):
+    """Build the python-docx Document for a spec.
+
+    With cached=False every paragraph is built on a fresh Document, which is the
+    reference path the template/fragment cache is measured against. The cached
+    Document is reused by the next call on the same thread.
+    """
+    spec = normalize_spec(spec)
+    if cached:
+        doc = _base_document()
+        write_report(doc, spec, _cached_fragment)
+    else:
+        doc = _new_base_document()
+        write_report(doc, spec, _inline_fragment)
+    return doc
+
+
+def build_kyp_report(spec, cached=True, backend=None):
+    """Render a KYP Analysis report for a spec and return the .docx bytes.
+
+    backend is "docx" or "ooxml" (default DEFAULT_BACKEND); cached only applies
+    to the python-docx backend.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == "ooxml":
+        import kyp_ooxml
+        report = kyp_ooxml.build_kyp_report(spec)
+    elif backend == "docx":
+        with kyp_metrics.span("build_document", backend="docx"):
+            doc = build_kyp_document(spec, cached=cached)
+
+        # Save the document to an in-memory buffer
+        with kyp_metrics.span("save", backend="docx"):
+            buffer = BytesIO()
+            doc.save(buffer)
+            report = buffer.getvalue()
+    else:
+        raise ValueError(f"Unknown report backend '{backend}', expected one of: {', '.join(BACKENDS)}")
+    kyp_metrics.count("reports_generated_total", backend=backend)
+    return report
@@ -0,0 +1,127 @@
+"""Risk-profile scoring for a whole client book.
+
+The Final Risk Profile rule from the page (lowest score among Need, Ability
+and Willingness) is precomputed into a 27-entry lookup table indexed by the
+three assessments, so a book of any size is scored in one vectorized pass:
+
+    python kyp_risk.py book.csv --out scored.csv
+
+Each row gets derived_risk_profile, and profile_mismatch flags rows whose
+final_risk_profile contradicts the rule. Rows with an assessment that is not
+High/Moderate/Low get no derived profile, and rows without a recognised
+final_risk_profile are not flagged.
+
+pandas is only imported for book scoring, so derive_profile stays cheap to
+import for the page.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+LEVELS = ("Low", "Moderate", "High")
+PROFILES = ("Aggressive", "Balanced", "Conservative", "Ultra-Conservative")
+FACTOR_COLUMNS = ("risk_need", "risk_ability", "risk_willingness")
+
+
+def _rule(need, ability, willingness):
+    # Levels are indexes into LEVELS: 0 Low, 1 Moderate, 2 High
+    if ability == 0 and willingness == 0:
+        return "Ultra-Conservative"
+    if min(need, ability, willingness) == 0:
+        return "Conservative"
+    if min(need, ability, willingness) == 1:
+        return "Balanced"
+    return "Aggressive"
+
+
+# PROFILE_TABLE[need * 9 + ability * 3 + willingness] -> index into PROFILES
+PROFILE_TABLE = np.array([
+    PROFILES.index(_rule(need, ability, willingness))
+    for need in range(3) for ability in range(3) for willingness in range(3)
+], dtype=np.int8)
+
+_LEVEL_CODES = {level.lower(): code for code, level in enumerate(LEVELS)}
+_PROFILE_CODES = {profile.lower(): code for code, profile in enumerate(PROFILES)}
+
+
+def derive_profile(need, ability, willingness):
+    """Return the rule-based Final Risk Profile for one client's assessments."""
+    n, a, w = (_LEVEL_CODES[value.strip().lower()] for value in (need, ability, willingness))
+    return PROFILES[PROFILE_TABLE[n * 9 + a * 3 + w]]
+
+
+def _codes(column, lookup):
+    # Factorize once, normalize only the distinct values, then map back: -1 for
+    # missing or unrecognised values.
+    import pandas as pd
+
+    codes, uniques = pd.factorize(column)
+    mapping = np.array([lookup.get(str(value).strip().lower(), -1) for value in uniques] + [-1], dtype=np.int8)
+    return mapping[codes]
+
+
+def score_book(book):
+    """Return a copy of book with derived_risk_profile and profile_mismatch columns added.
+
+    book needs risk_need, risk_ability and risk_willingness columns;
+    final_risk_profile is optional.
+    """
+    import pandas as pd
+
+    missing = [column for column in FACTOR_COLUMNS if column not in book.columns]
+    if missing:
+        raise ValueError(f"Client book is missing column(s): {', '.join(missing)}")
+
+    need, ability, willingness = (_codes(book[column], _LEVEL_CODES) for column in FACTOR_COLUMNS)
+    valid = (need >= 0) & (ability >= 0) & (willingness >= 0)
+    index = need.astype(np.intp) * 9 + ability.astype(np.intp) * 3 + willingness.astype(np.intp)
+    profile_codes = np.where(valid, PROFILE_TABLE[np.where(valid, index, 0)], -1)
+
+    scored = book.copy()
+    scored["derived_risk_profile"] = pd.Categorical.from_codes(profile_codes, categories=list(PROFILES))
+    if "final_risk_profile" in book.columns:
+        chosen = _codes(book["final_risk_profile"], _PROFILE_CODES)
+        scored["profile_mismatch"] = valid & (chosen >= 0) & (chosen != profile_codes)
+    return scored
+
+
+def read_book(path):
+    """Load a client book from .csv or .parquet (Parquet needs pyarrow or fastparquet)."""
+    import pandas as pd
+
+    if path.lower().endswith((".parquet", ".pq")):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype="string")
+
+
+def write_book(book, path):
+    if path.lower().endswith((".parquet", ".pq")):
+        book.to_parquet(path, index=False)
+    else:
+        book.to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a client book against the Final Risk Profile rule.")
+    parser.add_argument("book", help="CSV or Parquet file with risk_need, risk_ability, risk_willingness columns")
+    parser.add_argument("--out", help="write the scored book here (.csv or .parquet)")
+    args = parser.parse_args(argv)
+
+    book = read_book(args.book)
+    start = time.perf_counter()
+    scored = score_book(book)
+    elapsed = time.perf_counter() - start
+
+    if args.out:
+        write_book(scored, args.out)
+    rate = len(scored) / elapsed if elapsed > 0 else float("inf")
+    print(f"Scored {len(scored):,} rows in {elapsed:.3f}s: {rate:,.0f} rows/sec", file=sys.stderr)
+    if "profile_mismatch" in scored.columns:
+        print(f"{int(scored['profile_mismatch'].sum()):,} rows contradict the rule", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
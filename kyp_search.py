@@ -0,0 +1,131 @@
+"""Search-as-you-type index over fund names, tickers, codes and providers.
+
+Two inverted indexes are built once per list of funds:
+
+- word prefixes: the first 1-4 characters of every word -> fund ids, used for
+  matches at the start of a word ("fid", "xe", "bond ind"), which rank first;
+- trigrams of the whole search text -> fund ids, used for matches inside a word
+  ("607", "nadian"), which rank after word-prefix matches.
+
+Posting lists are sorted NumPy id arrays in catalog order. A query walks the
+shortest list for its terms in chunks, intersects each chunk with the other
+lists (searchsorted), checks the survivors in order and stops at `limit`
+results, so it never scores every fund. Exact code or ticker matches always
+come first.
+"""
+import re
+from collections import defaultdict
+
+import numpy as np
+
+PREFIX_LENGTHS = (1, 2, 3, 4)
+
+# Candidates are intersected and checked in chunks starting at this size and
+# doubling, so a query with plenty of matches stops after the first chunk and
+# one with none still intersects in a few large NumPy calls
+CHUNK_SIZE = 256
+
+_WORD = re.compile(r"[a-z0-9]+")
+_EMPTY = np.empty(0, dtype=np.uint32)
+
+
+def _search_text(fund):
+    return " ".join(part for part in (fund.name, fund.ticker, fund.code, fund.provider) if part).lower()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _iter_intersection(postings):
+    """Yield the intersection of sorted id arrays chunk by chunk, in id order."""
+    postings = sorted(postings, key=len)
+    driver, others = postings[0], postings[1:]
+    start, size = 0, CHUNK_SIZE
+    while start < len(driver):
+        candidates = driver[start:start + size]
+        start += size
+        size *= 2
+        for ids in others:
+            if not len(candidates):
+                break
+            positions = np.searchsorted(ids, candidates)
+            positions[positions == len(ids)] = 0
+            candidates = candidates[ids[positions] == candidates]
+        if len(candidates):
+            yield candidates.tolist()
+
+
+class FundSearchIndex:
+    """Ranked substring search over a fixed list of Fund records."""
+
+    def __init__(self, funds):
+        self.funds = tuple(funds)
+        self._texts = []
+        self._words = []
+        self._exact = {}
+        prefixes = defaultdict(list)
+        trigrams = defaultdict(list)
+        for fund_id, fund in enumerate(self.funds):
+            text = _search_text(fund)
+            words = tuple(dict.fromkeys(_WORD.findall(text)))
+            self._texts.append(text)
+            self._words.append(words)
+            for key in (fund.code, fund.ticker):
+                if key:
+                    self._exact.setdefault(key.lower(), fund_id)
+            for key in {word[:n] for word in words for n in PREFIX_LENGTHS}:
+                prefixes[key].append(fund_id)
+            for gram in _trigrams(text):
+                trigrams[gram].append(fund_id)
+        self._prefixes = {key: np.array(ids, dtype=np.uint32) for key, ids in prefixes.items()}
+        self._trigrams = {key: np.array(ids, dtype=np.uint32) for key, ids in trigrams.items()}
+
+    def __len__(self):
+        return len(self.funds)
+
+    def _prefix_match(self, fund_id, tokens):
+        words = self._words[fund_id]
+        return all(any(word.startswith(token) for word in words) for token in tokens)
+
+    def _substring_match(self, fund_id, tokens):
+        text = self._texts[fund_id]
+        return all(token in text for token in tokens)
+
+    def _collect(self, postings, match, tokens, results, seen, limit):
+        for chunk in _iter_intersection(postings):
+            for fund_id in chunk:
+                if fund_id not in seen and match(fund_id, tokens):
+                    results.append(fund_id)
+                    seen.add(fund_id)
+                    if len(results) >= limit:
+                        return
+
+    def search(self, query, limit=20):
+        """Return up to `limit` funds matching every term of the query, best matches first."""
+        tokens = _WORD.findall(query.lower())
+        if not tokens:
+            return list(self.funds[:limit])
+
+        results = []
+        seen = set()
+        exact = self._exact.get(query.strip().lower())
+        if exact is not None:
+            results.append(exact)
+            seen.add(exact)
+
+        # Matches at the start of a word
+        if len(results) < limit:
+            max_prefix = PREFIX_LENGTHS[-1]
+            postings = [self._prefixes.get(token[:max_prefix], _EMPTY) for token in tokens]
+            self._collect(postings, self._prefix_match, tokens, results, seen, limit)
+
+        # Matches inside words; only for terms long enough to carry a trigram
+        if len(results) < limit and all(len(token) >= 3 for token in tokens):
+            # The rarest trigram of each term narrows the candidates enough;
+            # the substring check on the survivors does the rest
+            postings = [min((self._trigrams.get(gram, _EMPTY) for gram in _trigrams(token)), key=len)
+                        for token in tokens]
+            self._collect(postings, self._substring_match, tokens, results, seen, limit)
+
+        return [self.funds[fund_id] for fund_id in results]
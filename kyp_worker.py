@@ -0,0 +1,349 @@
+"""Report-generation worker service.
+
+A local HTTP server that renders KYP reports on its own process pool, so heavy
+generation does not run on the Streamlit server's script threads:
+
+    python kyp_worker.py --port 8765 --workers 4 --queue-size 16
+
+and point the page at it with KYP_WORKER_URL=http://127.0.0.1:8765.
+
+Endpoints (JSON unless noted):
+
+    POST /jobs              spec as the JSON body -> 202 {"id", "status"}
+                            400 for an invalid spec, 503 + Retry-After when full
+    GET  /jobs/<id>         {"id", "status", ...}; ?wait=<seconds> blocks until
+                            the job finishes or the wait runs out
+    GET  /jobs/<id>/report  the .docx bytes once the job is done (409 before)
+    GET  /health            queue depth, running jobs and capacity
+    GET  /metrics           Prometheus text (with KYP_METRICS set)
+
+At most --queue-size jobs wait for one of the --workers dispatcher threads,
+each of which renders one job at a time on the process pool. A submission that
+finds the queue full is refused at once with 503, instead of queueing behind
+work it would wait minutes for, so accepted jobs keep a bounded latency.
+Finished jobs are kept for fetching until MAX_FINISHED_JOBS newer ones have
+finished.
+"""
+import argparse
+import json
+import math
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import kyp_metrics
+from kyp_report import BACKENDS, DEFAULT_BACKEND, build_kyp_report, normalize_spec
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 16
+
+# Pending connections the listening socket holds (ThreadingHTTPServer's default is 5),
+# so bursts of clients get a 503 from the handler instead of a refused connection
+REQUEST_QUEUE_SIZE = 128
+
+# Finished jobs (and their report bytes) kept for clients to fetch
+MAX_FINISHED_JOBS = 256
+
+# Longest ?wait a status request may block for, in seconds
+MAX_WAIT = 30.0
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]{32})(/report)?$")
+
+
+class Job:
+    __slots__ = ("id", "spec", "status", "error", "report", "submitted", "started", "finished", "done")
+
+    def __init__(self, spec):
+        self.id = uuid.uuid4().hex
+        self.spec = spec
+        self.status = "queued"
+        self.error = None
+        self.report = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    def describe(self):
+        info = {"id": self.id, "status": self.status, "submitted": self.submitted}
+        if self.started is not None:
+            info["started"] = self.started
+        if self.finished is not None:
+            info["finished"] = self.finished
+        if self.report is not None:
+            info["bytes"] = len(self.report)
+        if self.error is not None:
+            info["error"] = self.error
+        return info
+
+
+class ReportService:
+    """Bounded job queue in front of a process pool of report renderers."""
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE, backend=None):
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.backend = backend or DEFAULT_BACKEND
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._finished = OrderedDict()
+        self._running = 0
+        self._render_seconds = 1.0
+        self._threads = [
+            threading.Thread(target=self._dispatch, name=f"kyp-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, spec):
+        """Queue spec for rendering and return its Job; raises queue.Full when saturated."""
+        job = Job(spec)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            kyp_metrics.count("worker_jobs_rejected_total")
+            raise
+        kyp_metrics.count("worker_jobs_submitted_total")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely to free up."""
+        with self._lock:
+            per_job = self._render_seconds
+        return max(1, math.ceil(per_job * (self._queue.qsize() + 1) / self.workers))
+
+    def health(self):
+        with self._lock:
+            running = self._running
+        return {
+            "queued": self._queue.qsize(),
+            "running": running,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "backend": self.backend,
+        }
+
+    def _dispatch(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.started = time.time()
+            kyp_metrics.observe("worker_queue_wait", job.started - job.submitted)
+            with self._lock:
+                job.status = "running"
+                self._running += 1
+            try:
+                with kyp_metrics.span("worker_render", backend=self.backend):
+                    report = self._pool.submit(build_kyp_report, job.spec, backend=self.backend).result()
+            except Exception as exc:
+                job.error = f"{type(exc).__name__}: {exc}"
+                status = "failed"
+            else:
+                job.report = report
+                status = "done"
+            job.finished = time.time()
+            job.spec = None
+            with self._lock:
+                job.status = status
+                self._running -= 1
+                # Smoothed render time, for Retry-After estimates
+                self._render_seconds += 0.2 * ((job.finished - job.started) - self._render_seconds)
+                self._finished[job.id] = job
+                while len(self._finished) > MAX_FINISHED_JOBS:
+                    old_id, _ = self._finished.popitem(last=False)
+                    self._jobs.pop(old_id, None)
+            kyp_metrics.count("worker_jobs_total", status=status)
+            job.done.set()
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._pool.shutdown()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Set on the subclass built by make_server
+    service = None
+
+    def _send(self, status, body, content_type="application/json", headers=()):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            spec = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(spec, dict):
+                raise ValueError("the request body must be a JSON object")
+            normalize_spec(spec)
+        except (TypeError, ValueError) as exc:
+            self._send(400, {"error": str(exc)})
+            return
+        try:
+            job = self.service.submit(spec)
+        except queue.Full:
+            retry = self.service.retry_after()
+            self._send(503, {"error": "queue full", "retry_after": retry}, headers=[("Retry-After", str(retry))])
+            return
+        self._send(202, job.describe(), headers=[("Location", f"/jobs/{job.id}")])
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        if path == "/health":
+            self._send(200, self.service.health())
+            return
+        if path == "/metrics":
+            self._send(200, kyp_metrics.render().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+            return
+        match = _JOB_PATH.match(path)
+        job = match and self.service.get(match.group(1))
+        if not job:
+            self._send(404, {"error": "unknown job"})
+            return
+        if match.group(2):
+            if job.status != "done":
+                self._send(409, job.describe())
+                return
+            self._send(200, job.report, DOCX_MIME)
+            return
+        wait = re.search(r"(?:^|&)wait=([0-9.]+)", query)
+        if wait:
+            job.done.wait(min(float(wait.group(1)), MAX_WAIT))
+        self._send(200, job.describe())
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, workers=None, queue_size=DEFAULT_QUEUE_SIZE, backend=None):
+    """Return a ThreadingHTTPServer wrapping a new ReportService (server.service)."""
+    service = ReportService(workers=workers, queue_size=queue_size, backend=backend)
+    handler = type("Handler", (_Handler,), {"service": service})
+    server_class = type("Server", (ThreadingHTTPServer,), {"request_queue_size": REQUEST_QUEUE_SIZE})
+    server = server_class((host, port), handler)
+    server.service = service
+    return server
+
+
+# ---------------------------
+# Client
+# ---------------------------
+class WorkerBusy(Exception):
+    """The worker service refused a job because its queue is full."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Report service is busy; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class WorkerClient:
+    """Submits specs to a worker service and fetches the finished reports."""
+
+    def __init__(self, url, timeout=120.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, data=None, timeout=None):
+        request = urllib.request.Request(self.url + path, data=data)
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as exc:
+            if exc.code == 503:
+                raise WorkerBusy(int(exc.headers.get("Retry-After") or 1)) from None
+            if exc.code == 400:
+                raise ValueError(json.loads(exc.read()).get("error")) from None
+            raise
+
+    def submit(self, spec):
+        """Queue spec and return the job id; raises WorkerBusy when the queue is full."""
+        return json.loads(self._request("/jobs", json.dumps(spec).encode("utf-8")))["id"]
+
+    def status(self, job_id, wait=0.0):
+        query = f"?wait={wait:g}" if wait else ""
+        return json.loads(self._request(f"/jobs/{job_id}{query}", timeout=wait + self.timeout))
+
+    def report(self, job_id):
+        return self._request(f"/jobs/{job_id}/report")
+
+    def render(self, spec, poll=5.0):
+        """Submit spec, wait for the job and return the .docx bytes."""
+        job_id = self.submit(spec)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            status = self.status(job_id, wait=poll)
+            if status["status"] == "done":
+                return self.report(job_id)
+            if status["status"] == "failed":
+                raise RuntimeError(f"Report job {job_id} failed: {status.get('error')}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Report job {job_id} did not finish within {self.timeout:g}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve KYP report generation over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"jobs that may wait for a worker before submissions get 503 (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"rendering backend (default: {DEFAULT_BACKEND})")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, workers=args.workers, queue_size=args.queue_size,
+                         backend=args.backend)
+    host, port = server.server_address[:2]
+    print(f"Serving KYP reports on http://{host}:{port} with {server.service.workers} workers, "
+          f"queue of {args.queue_size}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
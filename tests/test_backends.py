@@ -0,0 +1,62 @@
+"""The ooxml backend must write the same package as the python-docx backend."""
+import io
+import zipfile
+
+import pytest
+
+from kyp_funds import equities_texts, fixed_income_texts
+from kyp_report import build_kyp_report
+
+EQUITIES = list(equities_texts)
+FIXED_INCOME = list(fixed_income_texts)
+
+SPECS = {
+    "defaults": {},
+    "typical": {
+        "selected_equities": EQUITIES[:2],
+        "selected_fixed_income": FIXED_INCOME[:1],
+        "compare_equities": EQUITIES[2:4],
+        "compare_fixed_income": FIXED_INCOME[1:3],
+        "risk_need_notes": "Needs growth to fund retirement in 20 years.",
+        "fee_amounts": [100_000],
+    },
+    "every_fund": {
+        "selected_equities": EQUITIES,
+        "selected_fixed_income": FIXED_INCOME,
+        "compare_equities": EQUITIES,
+        "compare_fixed_income": FIXED_INCOME,
+        "fee_amounts": [50_000, 250_000],
+        "fee_contribution": 6_000,
+    },
+    "whitespace": {
+        "risk_need_notes": "Goal:\tretire at 60\r\nHouse: 2030\rSale: 2032\nDone",
+        "risk_ability_notes": "  leading and trailing  ",
+        "client_name": "\tTabbed",
+        "investment_goals": "\n",
+    },
+    "escaping": {
+        "client_name": "O'Brien & Sons <Holdings> \"Ltd\"",
+        "recommendation_notes": "Café — ½ \U0001f4c8 \x7f",
+    },
+}
+
+
+def _parts(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as package:
+        return {name: package.read(name) for name in package.namelist()}
+
+
+@pytest.mark.parametrize("name", sorted(SPECS))
+def test_backends_write_identical_packages(name):
+    spec = dict(SPECS[name], report_date="2026-01-01")
+    docx_parts = _parts(build_kyp_report(spec, backend="docx"))
+    ooxml_parts = _parts(build_kyp_report(spec, backend="ooxml"))
+    assert docx_parts["word/document.xml"] == ooxml_parts["word/document.xml"]
+    assert docx_parts == ooxml_parts
+
+
+@pytest.mark.parametrize("char", ["\x00", "\x01", "\x0b", "\x0c", "\x1f", "￾"])
+@pytest.mark.parametrize("backend", ["docx", "ooxml"])
+def test_control_characters_are_rejected(backend, char):
+    with pytest.raises(ValueError, match="XML compatible"):
+        build_kyp_report({"risk_need_notes": f"line one{char}line two"}, backend=backend)
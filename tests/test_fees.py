@@ -0,0 +1,80 @@
+"""Fee-drag projections that go into the client document."""
+import numpy as np
+import pytest
+
+from kyp_fees import TABLE_HEADER, compare_fees, future_value
+from kyp_funds import Fund
+
+
+class Catalog:
+    def __init__(self, *funds):
+        self._by_name = {fund.name: fund for fund in funds}
+
+    def by_name(self, name):
+        return self._by_name.get(name)
+
+
+LOW = Fund("LOW", "Low Fee Fund", "equities", "Provider", mer=1.0)
+HIGH = Fund("HIGH", "High Fee Fund", "equities", "Provider", mer=2.0)
+NO_MER = Fund("NOMER", "No MER Fund", "fixed_income", "Provider")
+CATALOG = Catalog(LOW, HIGH, NO_MER)
+
+
+def test_future_value_lump_sum():
+    # 100,000 * 1.05 ** 10
+    assert future_value(100_000.0, 0.05, 10) == pytest.approx(162_889.46, abs=0.01)
+
+
+def test_future_value_with_contributions():
+    # 1,000 * 1.05 ** 3 = 1,157.625, plus year-end 1,000s: 1,102.50 + 1,050 + 1,000 = 3,152.50
+    assert future_value(1_000.0, 0.05, 3, contribution=1_000.0) == pytest.approx(4_310.125)
+
+
+def test_future_value_zero_rate():
+    assert future_value(100_000.0, 0.0, 10, contribution=5_000.0) == pytest.approx(150_000.0)
+
+
+def test_return_equal_to_mer():
+    fees = compare_fees([HIGH.name], amounts=[100_000], horizons=[10], returns=[2.0], contribution=5_000,
+                        catalog=CATALOG)
+    assert fees.ending[0, 0, 0, 0] == pytest.approx(150_000.0)
+    assert fees.gross[0, 0, 0, 0] == pytest.approx(float(future_value(100_000.0, 0.02, 10, 5_000.0)))
+    assert np.isfinite(fees.drag).all()
+
+
+def test_funds_without_mer_and_duplicates_are_dropped():
+    fees = compare_fees([LOW.name, NO_MER.name], [LOW.name, HIGH.name, NO_MER.name], catalog=CATALOG)
+    assert [fund.code for fund in fees.funds] == ["LOW", "HIGH"]
+    assert fees.roles == ("Primary", "Comparison")
+    assert fees.ending.shape == (2, 1, 3, 4)
+
+
+def test_unknown_fund():
+    with pytest.raises(ValueError, match="Unknown fund: Missing"):
+        compare_fees(["Missing"], catalog=CATALOG)
+
+
+def test_table_pivots_horizons_into_columns():
+    fees = compare_fees([LOW.name], amounts=[100_000], horizons=[1, 2], returns=[5.0], catalog=CATALOG)
+    assert fees.table_header() == TABLE_HEADER + ("1 Years", "2 Years")
+    # Gross 105,000 and 110,250; net of a 1% MER 104,000 and 108,160
+    assert fees.table_rows() == [
+        ("Low Fee Fund", "Primary", "1.00%", "$100,000", "5%", "$104,000\n$1,000 fees", "$108,160\n$2,090 fees"),
+    ]
+
+
+def test_table_rows_order():
+    fees = compare_fees([LOW.name], [HIGH.name], amounts=[100_000, 250_000], horizons=[5, 10, 20],
+                        returns=[4.0, 6.0], catalog=CATALOG)
+    rows = fees.table_rows()
+    assert len(rows) == 2 * 2 * 2
+    assert all(len(row) == len(fees.table_header()) for row in rows)
+    assert [row[:5] for row in rows[:3]] == [
+        ("Low Fee Fund", "Primary", "1.00%", "$100,000", "4%"),
+        ("Low Fee Fund", "Primary", "1.00%", "$100,000", "6%"),
+        ("Low Fee Fund", "Primary", "1.00%", "$250,000", "4%"),
+    ]
+    # High Fee Fund, $250,000 at 6%, 20 years
+    value = future_value(250_000.0, 0.04, 20)
+    drag = future_value(250_000.0, 0.06, 20) - value
+    assert rows[-1][-1] == f"${value:,.0f}\n${drag:,.0f} fees"
@@ -0,0 +1,71 @@
+"""PrerenderSession hands back only renders that started before Generate."""
+import threading
+import time
+
+from kyp_prerender import PrerenderSession, new_executor
+
+
+def session(render, debounce=0.05):
+    return PrerenderSession(new_executor(1), render=render, debounce=debounce)
+
+
+def test_result_after_render_finished():
+    prerender = session(lambda spec: spec["text"].encode())
+    prerender.schedule("a", {"text": "report"})
+    time.sleep(0.2)
+    assert prerender.held() == b"report"
+    assert prerender.result("a") == b"report"
+
+
+def test_result_while_debouncing_returns_none_and_drops_render():
+    calls = []
+    prerender = session(calls.append, debounce=0.2)
+    prerender.schedule("a", {})
+    assert prerender.result("a") is None
+    time.sleep(0.4)
+    assert calls == []
+
+
+def test_result_waits_for_running_render():
+    started, release = threading.Event(), threading.Event()
+
+    def render(spec):
+        started.set()
+        release.wait(5)
+        return b"report"
+
+    prerender = session(render)
+    prerender.schedule("a", {})
+    assert started.wait(5)
+    threading.Timer(0.1, release.set).start()
+    assert prerender.result("a") == b"report"
+
+
+def test_result_drops_render_queued_behind_other_sessions():
+    release = threading.Event()
+    executor = new_executor(1)
+    executor.submit(release.wait, 5)
+    calls = []
+    prerender = PrerenderSession(executor, render=calls.append, debounce=0.01)
+    prerender.schedule("a", {})
+    time.sleep(0.2)
+    assert prerender.result("a") is None
+    release.set()
+    executor.shutdown(wait=True)
+    assert calls == []
+
+
+def test_result_for_other_spec_returns_none():
+    prerender = session(lambda spec: b"report")
+    prerender.schedule("a", {})
+    time.sleep(0.2)
+    assert prerender.result("b") is None
+
+
+def test_timer_after_shutdown_drops_render():
+    executor = new_executor(1)
+    prerender = PrerenderSession(executor, render=lambda spec: b"report", debounce=0.05)
+    prerender.schedule("a", {})
+    executor.shutdown()
+    time.sleep(0.2)
+    assert prerender.held() is None
@@ -0,0 +1,97 @@
+"""The Final Risk Profile rule, checked against the page's stated rules."""
+import itertools
+
+import pandas as pd
+import pytest
+
+from kyp_risk import LEVELS, PROFILE_TABLE, PROFILES, derive_profile, read_book, score_book
+
+COMBINATIONS = list(itertools.product(LEVELS, repeat=3))
+
+
+def expected_profile(need, ability, willingness):
+    # "Based on the lowest score among Need, Ability, and Willingness", with Low
+    # ability and Low willingness together being Ultra-Conservative
+    if ability == "Low" and willingness == "Low":
+        return "Ultra-Conservative"
+    lowest = min((need, ability, willingness), key=LEVELS.index)
+    return {"High": "Aggressive", "Moderate": "Balanced", "Low": "Conservative"}[lowest]
+
+
+def test_table_has_an_entry_per_combination():
+    assert len(PROFILE_TABLE) == 27
+    assert set(PROFILE_TABLE) <= set(range(len(PROFILES)))
+
+
+@pytest.mark.parametrize("need, ability, willingness", COMBINATIONS)
+def test_derive_profile(need, ability, willingness):
+    assert derive_profile(need, ability, willingness) == expected_profile(need, ability, willingness)
+
+
+@pytest.mark.parametrize("need, ability, willingness", COMBINATIONS)
+def test_page_rules(need, ability, willingness):
+    profile = derive_profile(need, ability, willingness)
+    # Aggressive: High scores across all three categories
+    if (need, ability, willingness) == ("High", "High", "High"):
+        assert profile == "Aggressive"
+    # Balanced: Moderate ability or willingness but high need
+    if need == "High" and "Low" not in (ability, willingness) and "Moderate" in (ability, willingness):
+        assert profile == "Balanced"
+    # Conservative: Low willingness or ability, regardless of need
+    if (ability == "Low") != (willingness == "Low"):
+        assert profile == "Conservative"
+    # Ultra-Conservative: Low ability and low willingness, even if returns are needed
+    if ability == "Low" and willingness == "Low":
+        assert profile == "Ultra-Conservative"
+    assert (profile == "Aggressive") == (need == ability == willingness == "High")
+
+
+def test_derive_profile_normalizes_case_and_whitespace():
+    assert derive_profile(" high", "MODERATE ", "High") == "Balanced"
+
+
+def test_derive_profile_rejects_unknown_level():
+    with pytest.raises(KeyError):
+        derive_profile("Very High", "High", "High")
+
+
+def test_score_book_matches_derive_profile():
+    book = pd.DataFrame(COMBINATIONS, columns=["risk_need", "risk_ability", "risk_willingness"])
+    scored = score_book(book)
+    assert list(scored["derived_risk_profile"]) == [derive_profile(*row) for row in COMBINATIONS]
+    assert "profile_mismatch" not in scored.columns
+
+
+def test_score_book_flags_mismatches():
+    book = pd.DataFrame({
+        "risk_need": ["High", "High", "high", "Low", "High", "High"],
+        "risk_ability": ["High", "High", " HIGH ", "Low", "High", "Very High"],
+        "risk_willingness": ["High", "High", "High", "Low", "High", "High"],
+        "final_risk_profile": ["Aggressive", "Balanced", "aggressive ", "Conservative", "Unsure", "Balanced"],
+    })
+    scored = score_book(book)
+    assert list(scored["profile_mismatch"]) == [False, True, False, True, False, False]
+    assert list(scored["derived_risk_profile"].astype(object).fillna("")) == [
+        "Aggressive", "Aggressive", "Aggressive", "Ultra-Conservative", "Aggressive", ""]
+
+
+def test_score_book_missing_values(tmp_path):
+    path = tmp_path / "book.csv"
+    path.write_text(
+        "risk_need,risk_ability,risk_willingness,final_risk_profile\n"
+        "High,High,High,\n"
+        ",High,High,Aggressive\n"
+        "Moderate,High,High,Conservative\n",
+        encoding="utf-8",
+    )
+    book = read_book(str(path))
+    assert book["final_risk_profile"][0] is pd.NA and book["risk_need"][1] is pd.NA
+    scored = score_book(book)
+    assert scored["derived_risk_profile"].isna().tolist() == [False, True, False]
+    # No final profile, or no derived profile: not flagged
+    assert list(scored["profile_mismatch"]) == [False, False, True]
+
+
+def test_score_book_requires_factor_columns():
+    with pytest.raises(ValueError, match="risk_willingness"):
+        score_book(pd.DataFrame({"risk_need": ["High"], "risk_ability": ["High"]}))